@@ -0,0 +1,184 @@
+"""Load-test lambda_handler against local S3 and Bedrock stand-ins.
+
+Replays a query mix covering every intent (deterministic answers and
+Claude fallbacks) across departments and reports throughput, latency
+percentiles, S3 calls and bytes, Bedrock calls and prompt sizes, overall
+and per intent. Data comes from local_backends.write_sample_bucket()
+unless --local points at a copy of the real bucket
+(<dir>/college-ai-data/<department>/*.json).
+
+Usage:
+    python benchmark.py --requests 500 --concurrency 8 --s3-latency 0.02 --model-latency 0.8
+    python benchmark.py --cold --json results.json
+    python benchmark.py --snapshot --s3-latency 0.02   # start from a corpus snapshot
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Only load a corpus snapshot when asked to (--snapshot)
+os.environ["CORPUS_SNAPSHOT"] = ""
+
+import lambda_function
+from build_index import build_local
+from corpus_files import read_local
+from local_backends import FakeBedrock, LocalS3, write_sample_bucket
+
+QUERY_MIX = [
+    ("list faculty", "faculty"),
+    ("who is the hod", "faculty"),
+    ("faculty Anitha details", "faculty"),
+    ("which professor works on quantum sensing", "faculty"),
+    ("conference papers on machine learning", "conference"),
+    ("ai project ideas", "project_ideas"),
+    ("project ideas", "project_ideas"),
+    ("display all the industrial projects done", "industry"),
+    ("Tell me about the Smart Parking", "industry"),
+    ("which companies offer internships", "industry"),
+    ("mission and vision of the department", "faq"),
+    ("unit links of sem 3", "important_links"),
+    ("important questions link for Compiler Design", "important_links"),
+    ("subjects in semester 5", "syllabus"),
+    ("units of CS305", "syllabus"),
+    ("syllabus of quantum computing", "syllabus"),
+    ("credits for CS402", "course_code"),
+    ("what is XY999 about", "course_code"),
+    ("elective courses available", "electives"),
+    ("where is the college located", "default"),
+    ("how do i apply for a scholarship", "default"),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def reset_caches():
+    lambda_function.corpus_cache.clear()
+    if lambda_function.answer_cache.store is not None:
+        lambda_function.answer_cache.store.clear()
+
+
+def run(args, s3, model):
+    departments = [d.strip().lower() for d in args.departments.split(",")]
+    plan = [
+        (QUERY_MIX[i % len(QUERY_MIX)], departments[(i // len(QUERY_MIX)) % len(departments)])
+        for i in range(args.requests)
+    ]
+
+    def one(item):
+        (question, intent), department = item
+        if args.cold:
+            reset_caches()
+        event = {"queryStringParameters": {"q": question, "department": department}}
+        start = time.perf_counter()
+        response = lambda_function.lambda_handler(event, None)
+        return intent, (time.perf_counter() - start) * 1000, response["statusCode"]
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for item in plan[:args.warmup]:
+            one(item)
+        s3.reset_counters()
+        model.reset_counters()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(one, plan))
+        elapsed = time.perf_counter() - started
+
+    latencies = [ms for _, ms, _ in results]
+    by_intent = {}
+    for intent, ms, _ in results:
+        by_intent.setdefault(intent, []).append(ms)
+
+    return {
+        "requests": len(results),
+        "errors": sum(status >= 500 for _, _, status in results),
+        "concurrency": args.concurrency,
+        "throughput_rps": len(results) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "s3_calls_per_request": s3.calls / len(results),
+        "s3_bytes_per_request": s3.bytes / len(results),
+        "bedrock_calls": model.calls,
+        "bedrock_throttled": model.throttled,
+        "prompt_chars_mean": sum(model.prompt_chars) / len(model.prompt_chars) if model.prompt_chars else 0,
+        "prompt_chars_p95": percentile(model.prompt_chars, 95),
+        "corpus_cache": lambda_function.corpus_cache.stats(),
+        "answer_cache": lambda_function.answer_cache.stats(),
+        "intents": {
+            intent: {"requests": len(ms), "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95)}
+            for intent, ms in sorted(by_intent.items())
+        },
+    }
+
+
+def report(result):
+    print(f"requests {result['requests']}  errors {result['errors']}  concurrency {result['concurrency']}")
+    print(f"throughput {result['throughput_rps']:.1f} req/s  "
+          f"p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+    print(f"S3 {result['s3_calls_per_request']:.2f} calls, {result['s3_bytes_per_request']:.0f} bytes per request")
+    print(f"Bedrock {result['bedrock_calls']} calls, {result['bedrock_throttled']} throttled, prompt {result['prompt_chars_mean']:.0f} chars mean, "
+          f"{result['prompt_chars_p95']:.0f} p95")
+    print(f"corpus cache {result['corpus_cache']['hit_ratio']:.0%} hits, answer cache {result['answer_cache']['hit_ratio']:.0%} hits")
+    print(f"\n{'intent':<18}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for intent, stats in result["intents"].items():
+        print(f"{intent:<18}{stats['requests']:>10}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--local", help="directory holding <bucket>/<department>/*.json (default: generated sample data)")
+    parser.add_argument("--departments", default="cse,it")
+    parser.add_argument("--requests", type=int, default=210)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=0, help="requests replayed before measuring")
+    parser.add_argument("--cold", action="store_true", help="clear the corpus and answer caches before every request")
+    parser.add_argument("--s3-latency", type=float, default=0.0, help="seconds added to every S3 call")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="seconds added to every Bedrock call")
+    parser.add_argument("--bedrock-rps", type=float, default=1000.0, help="rate limiter budget during the run")
+    parser.add_argument("--bedrock-throttle", type=int, default=0, help="Bedrock calls that fail with throttling first")
+    parser.add_argument("--no-answer-cache", action="store_true")
+    parser.add_argument("--shipped-indexes", action="store_true", help="build <file>.idx.json next to the data first and load them")
+    parser.add_argument("--snapshot", action="store_true", help="seed the corpus cache from a snapshot of the data first")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    root = args.local or write_sample_bucket(tempfile.mkdtemp(prefix="college-bot-"),
+                                             departments=args.departments.split(","))
+    if args.shipped_indexes:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            build_local(os.path.join(root, lambda_function.BUCKET))
+        lambda_function.LOAD_SHIPPED_INDEXES = True
+
+    s3 = LocalS3(root, latency=args.s3_latency)
+    model = FakeBedrock(latency=args.model_latency, fail_first=args.bedrock_throttle)
+    lambda_function.set_backends(s3, model)
+    lambda_function.bedrock_limiter = lambda_function.RateLimiter(args.bedrock_rps, 10 ** 9)
+    if args.no_answer_cache:
+        lambda_function.answer_cache = lambda_function.AnswerCache(None)
+    reset_caches()
+    if args.snapshot:
+        path = os.path.join(root, "corpus_snapshot.pkl")
+        lambda_function.write_snapshot(path, lambda_function.BUCKET, read_local(os.path.join(root, lambda_function.BUCKET)))
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            lambda_function.load_snapshot(path, validate=False)
+
+    result = run(args, s3, model)
+    report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
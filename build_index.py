@@ -0,0 +1,53 @@
+"""Build the retrieval indexes the Lambda loads when LOAD_SHIPPED_INDEXES=1.
+
+Each department file gets an index stored next to it, e.g.
+cse/faculty.json -> cse/faculty.idx.json. The index records the ETag of the
+file it was built from, so the Lambda ignores it once the file changes.
+
+Usage:
+    python build_index.py --department cse --department it
+    python build_index.py --local ./college-ai-data
+"""
+
+import argparse
+import os
+
+from corpus_files import read_from_s3, read_local
+from lambda_function import BUCKET, build_index, dump_index, index_key_for, s3_client, source_label
+
+
+def _index(key, text, etag):
+    index = build_index(text, etag, source_label(key))
+    print(f"{key}: {len(index['chunks'])} chunks, {len(index['postings'])} terms")
+    return dump_index(index)
+
+
+def build_from_s3(bucket, departments):
+    s3 = s3_client()
+    for key, (text, etag) in read_from_s3(bucket, departments).items():
+        s3.put_object(
+            Bucket=bucket,
+            Key=index_key_for(key),
+            Body=_index(key, text, etag).encode('utf-8'),
+            ContentType="application/json"
+        )
+
+
+def build_local(root):
+    """Index a local copy of the bucket (<root>/<department>/<file>.json)."""
+    for key, (text, etag) in read_local(root).items():
+        with open(os.path.join(root, *index_key_for(key).split("/")), "w", encoding="utf-8") as f:
+            f.write(_index(key, text, etag))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bucket", default=BUCKET)
+    parser.add_argument("--department", action="append", default=[], help="department prefix, e.g. cse")
+    parser.add_argument("--local", help="build from a local copy of the bucket instead of S3")
+    args = parser.parse_args()
+
+    if args.local:
+        build_local(args.local)
+    else:
+        build_from_s3(args.bucket, args.department or ["cse"])
@@ -0,0 +1,31 @@
+"""Build the corpus snapshot the Lambda loads at cold start.
+
+The snapshot holds every department file's text and ETag together with its
+retrieval index and lookups, pickled into one file that is shipped in the
+deployment package next to lambda_function.py. A cold container then answers
+from it straight away and only revalidates the files against S3 in the
+background.
+
+Usage:
+    python build_snapshot.py --department cse --department it
+    python build_snapshot.py --local ./college-ai-data --out corpus_snapshot.pkl
+"""
+
+import argparse
+import os
+
+from corpus_files import read_from_s3, read_local
+from lambda_function import BUCKET, CORPUS_SNAPSHOT, write_snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bucket", default=BUCKET)
+    parser.add_argument("--department", action="append", default=[], help="department prefix, e.g. cse")
+    parser.add_argument("--local", help="build from a local copy of the bucket instead of S3")
+    parser.add_argument("--out", default=CORPUS_SNAPSHOT)
+    args = parser.parse_args()
+
+    files = read_local(args.local) if args.local else read_from_s3(args.bucket, args.department or ["cse"])
+    snapshot = write_snapshot(args.out, args.bucket, files)
+    print(f"{args.out}: {len(snapshot['files'])} files, {os.path.getsize(args.out)} bytes")
@@ -1,5 +1,40 @@
 import React, { useState, useEffect } from "react";
 
+const API_URL =
+  "https://l2n698llce.execute-api.us-east-1.amazonaws.com/prod/GetCollegeInfo";
+// Function URL of the streaming endpoint (stream_server.py); unset = no streaming
+const STREAM_API_URL = import.meta.env.VITE_STREAM_API_URL;
+
+// Reads the newline-delimited JSON stream, reporting the answer so far
+async function askStreaming(url, onPartial) {
+  const response = await fetch(url);
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  let answer = "";
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.error) throw new Error(event.error);
+    if (event.delta) {
+      answer += event.delta;
+      onPartial(answer);
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffered);
+  return answer || "No response received.";
+}
+
 function CollegeBot() {
   const [question, setQuestion] = useState("");
   const [answer, setAnswer] = useState("");
@@ -38,14 +73,22 @@ function CollegeBot() {
     if (!question.trim()) return;
     setLoading(true);
     try {
-      const response = await fetch(
-        `https://l2n698llce.execute-api.us-east-1.amazonaws.com/prod/GetCollegeInfo?q=${encodeURIComponent(
-          question
-        )}&department=${department.toLowerCase()}`
-      );
+      const query = `q=${encodeURIComponent(
+        question
+      )}&department=${department.toLowerCase()}`;
+      let responseAnswer;
 
-      const data = await response.json();
-      const responseAnswer = data.answer || "No response received.";
+      if (STREAM_API_URL) {
+        // Show the answer while it is still being generated
+        responseAnswer = await askStreaming(`${STREAM_API_URL}?${query}`, (partial) => {
+          setAnswer(partial);
+          setSelectedQA({ question, answer: partial });
+        });
+      } else {
+        const response = await fetch(`${API_URL}?${query}`);
+        const data = await response.json();
+        responseAnswer = data.answer || "No response received.";
+      }
 
       const newQA = { question, answer: responseAnswer };
       setAnswer(responseAnswer);
@@ -228,6 +271,7 @@ function CollegeBot() {
             <option value="CSBS">CSBS</option>
             <option value="MECH">MECH</option>
             <option value="CIVIL">CIVIL</option>
+            <option value="CSE,IT,CSBS,MECH,CIVIL">All departments</option>
           </select>
 
           {/* Suggested Keywords */}
@@ -282,7 +326,7 @@ function CollegeBot() {
 
           <input
             type="text"
-            placeholder={`Ask something about ${department}...`}
+            placeholder={`Ask something about ${department.includes(",") ? "all departments" : department}...`}
             value={question}
             onChange={(e) => setQuestion(e.target.value)}
             onKeyDown={(e) => e.key === "Enter" && handleAsk()}
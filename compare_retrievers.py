@@ -0,0 +1,163 @@
+"""Compare retrieval quality and latency of the Lambda's retrievers.
+
+Runs a labeled query set against a local copy of the bucket with:
+  legacy  find_best_chunks, the handler's ranking before the indexes, over the
+          concatenated department files
+  count   the per-file inverted index (raw term counts)
+  bm25    BM25 over the per-file term matrices
+
+The queries file is a JSON list such as
+    [{"department": "cse", "question": "who teaches cloud computing", "expect": "Ravi Shankar"}]
+where "expect" (a string or a list of strings) is text a relevant chunk
+contains. A query counts as a hit when any of the top chunks contains it.
+Without --local and --queries, LABELED_QUERIES below is run against
+local_backends.write_sample_bucket() data.
+
+Usage:
+    python compare_retrievers.py
+    python compare_retrievers.py --local ./college-ai-data --queries queries.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from lambda_function import (
+    BM25_B, BM25_K1, BUCKET, FILENAMES, TermMatrix, build_index, chunk_text,
+    search_bm25, search_index, source_label, tokenize
+)
+from local_backends import write_sample_bucket
+
+# Labeled for the sample data written by local_backends.write_sample_bucket()
+LABELED_QUERIES = [
+    {"department": "cse", "question": "who is the hod", "expect": "Professor & HOD"},
+    {"department": "cse", "question": "email of Karthik Subramanian", "expect": "karthik.3@college.edu"},
+    {"department": "cse", "question": "which faculty research cryptography", "expect": "Karthik Subramanian"},
+    {"department": "cse", "question": "units of digital logic", "expect": "Digital Logic unit 1"},
+    {"department": "cse", "question": "what is taught in CS204", "expect": "Big Data Analytics unit"},
+    {"department": "cse", "question": "which company worked on smart parking", "expect": "Geons"},
+    {"department": "cse", "question": "students involved in crop disease detection", "expect": "Revathi"},
+    {"department": "cse", "question": "what is the vision of the department", "expect": "centre of excellence"},
+    {"department": "cse", "question": "program outcomes", "expect": "Graduates apply engineering knowledge"},
+    {"department": "cse", "question": "blockchain project ideas", "expect": "Blockchain idea"},
+    {"department": "cse", "question": "important questions for compiler design", "expect": "youtu.be/cse43"},
+    {"department": "cse", "question": "open elective on theory of computation", "expect": "CSE01"},
+    {"department": "cse", "question": "papers by Anitha Krishnan", "expect": "Towards Operating Systems"},
+    {"department": "it", "question": "who is the head of the department", "expect": "Professor & HOD"},
+    {"department": "it", "question": "which professors work on machine learning", "expect": ["Priya Iyer", "Karthik Krishnan"]},
+    {"department": "it", "question": "phone number of Ravi Nair", "expect": "9840000001"},
+    {"department": "it", "question": "units of web technologies", "expect": "Web Technologies unit 1"},
+    {"department": "it", "question": "duration of the smart parking project", "expect": "4 months"},
+    {"department": "it", "question": "which industry partner did crop disease detection", "expect": "Infosys"},
+    {"department": "it", "question": "mission of the department", "expect": "quality education and research"},
+    {"department": "it", "question": "iot project ideas", "expect": "IoT idea"},
+    {"department": "it", "question": "important question link for data structures", "expect": "youtu.be/it44"},
+    {"department": "it", "question": "papers published at IEEE ICC on data mining", "expect": "A study of Data Mining"},
+    {"department": "it", "question": "credits of ITE00 operating systems elective", "expect": "ITE00"},
+]
+
+
+def load_department(root, department):
+    """{key: text} of the department's files in a local copy of the bucket."""
+    texts = {}
+    for name in FILENAMES:
+        path = os.path.join(root, department, name)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                texts[f"{department}/{name}"] = f.read()
+    return texts
+
+
+def score_chunk(chunk, question_tokens):
+    chunk_tokens = tokenize(chunk)
+    counter = Counter(chunk_tokens)
+    return sum(counter[token] for token in question_tokens)
+
+
+def find_best_chunks(text, question, top_n=3):
+    """Legacy baseline: score every fixed-size chunk of `text` and return the best `top_n`."""
+    question_tokens = tokenize(question)
+    chunks = chunk_text(text)
+    scored_chunks = [(chunk, score_chunk(chunk, question_tokens)) for chunk in chunks]
+    sorted_chunks = sorted(scored_chunks, key=lambda x: x[1], reverse=True)
+    return [chunk for chunk, score in sorted_chunks[:top_n]]
+
+
+def first_relevant_rank(chunks, expected):
+    for rank, chunk in enumerate(chunks, 1):
+        if any(e.lower() in chunk.lower() for e in expected):
+            return rank
+    return None
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--local", help="local copy of the bucket (<dir>/<department>/<file>.json; default: generated sample data)")
+    parser.add_argument("--queries", help="labeled queries (JSON; default: LABELED_QUERIES)")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--k1", type=float, default=BM25_K1)
+    parser.add_argument("--b", type=float, default=BM25_B)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    args = parser.parse_args()
+
+    root = args.local or os.path.join(write_sample_bucket(tempfile.mkdtemp(prefix="college-bot-")), BUCKET)
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = json.load(f)
+    else:
+        queries = LABELED_QUERIES
+
+    # Indexes are built once up front, as a warm Lambda would have them
+    corpora = {}
+    for department in {q["department"].lower() for q in queries}:
+        texts = load_department(root, department)
+        indexes = [build_index(text, label=source_label(key)) for key, text in texts.items()]
+        corpora[department] = {
+            "text": "\n\n".join(texts.values()),
+            "indexes": indexes,
+            "matrices": [TermMatrix(index) for index in indexes],
+        }
+
+    retrievers = {
+        "legacy": lambda corpus, question: find_best_chunks(corpus["text"], question, args.top_n),
+        "count": lambda corpus, question: [
+            chunk for chunk, _ in search_index(corpus["indexes"], tokenize(question), args.top_n)
+        ],
+        "bm25": lambda corpus, question: [
+            chunk for chunk, _ in search_bm25(corpus["matrices"], tokenize(question), args.top_n, args.k1, args.b)
+        ],
+    }
+
+    print(f"{'retriever':<10}{'hit@k':>8}{'MRR':>8}{'ctx chars':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, retrieve in retrievers.items():
+        hits, reciprocal_ranks, context_sizes, latencies = 0, [], [], []
+        for query in queries:
+            corpus = corpora[query["department"].lower()]
+            expected = query["expect"] if isinstance(query["expect"], list) else [query["expect"]]
+
+            chunks = retrieve(corpus, query["question"])
+            rank = first_relevant_rank(chunks, expected)
+            hits += rank is not None
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            context_sizes.append(len("\n\n".join(chunks)))
+
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                retrieve(corpus, query["question"])
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        print(f"{name:<10}{hits / len(queries):>8.2f}{sum(reciprocal_ranks) / len(queries):>8.2f}"
+              f"{sum(context_sizes) / len(queries):>12.0f}{percentile(latencies, 50):>10.3f}"
+              f"{percentile(latencies, 95):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Read every department file with its ETag, from S3 or a local copy of the bucket.
+
+Shared by build_index.py and build_snapshot.py. Both readers return
+{key: (text, etag)}, e.g. {"cse/faculty.json": ("[...]", '"9b2c..."')}.
+"""
+
+import hashlib
+import os
+
+from lambda_function import FILENAMES, s3_client
+
+
+def read_from_s3(bucket, departments):
+    """Department files of `departments` in the bucket; missing files are skipped."""
+    s3 = s3_client()
+    files = {}
+    for department in departments:
+        for name in FILENAMES:
+            key = f"{department.lower()}/{name}"
+            try:
+                obj = s3.get_object(Bucket=bucket, Key=key)
+            except s3.exceptions.NoSuchKey:
+                print(f"Skipping {key}: not found")
+                continue
+            files[key] = (obj['Body'].read().decode('utf-8'), obj["ETag"])
+    return files
+
+
+def read_local(root):
+    """Department files of a local copy of the bucket (<root>/<department>/<file>.json)."""
+    files = {}
+    for department in sorted(os.listdir(root)):
+        for name in FILENAMES:
+            path = os.path.join(root, department, name)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                raw = f.read()
+            # S3's ETag for a single-part upload is the quoted MD5 of the body
+            files[f"{department}/{name}"] = (raw.decode('utf-8'), f'"{hashlib.md5(raw).hexdigest()}"')
+    return files
@@ -0,0 +1,63 @@
+"""Invoke lambda_handler with event files against the local S3 and Bedrock stand-ins.
+
+Events are replayed in order in one process, so the corpus cache carries
+over between them, as in a warm container. Data comes from
+local_backends.write_sample_bucket() unless --local points at a copy of the
+bucket (<dir>/college-ai-data/<department>/*.json).
+
+Usage:
+    python invoke_local.py events/query.json events/s3_object_created.json events/query.json --change cse/faculty.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+# Start from an empty cache rather than a corpus snapshot
+os.environ["CORPUS_SNAPSHOT"] = ""
+
+import lambda_function
+from local_backends import FakeBedrock, LocalS3, write_sample_bucket
+
+
+def change_object(root, key):
+    """Append a newline to `key` in the local bucket: same JSON, new ETag."""
+    with open(os.path.join(root, lambda_function.BUCKET, *key.split("/")), "a", encoding="utf-8") as f:
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("events", nargs="+", help="event JSON files")
+    parser.add_argument("--local", help="directory holding <bucket>/<department>/*.json (default: generated sample data)")
+    parser.add_argument("--change", action="append", default=[],
+                        help="key rewritten in the local bucket before the first S3 event, e.g. cse/faculty.json")
+    parser.add_argument("--logs", action="store_true", help="show the handler's log output")
+    args = parser.parse_args()
+
+    root = args.local or write_sample_bucket(tempfile.mkdtemp(prefix="college-bot-"))
+    lambda_function.set_backends(LocalS3(root), FakeBedrock())
+
+    changed = False
+    for path in args.events:
+        with open(path, encoding="utf-8") as f:
+            event = json.load(f)
+        if lambda_function.s3_changes(event) and not changed:
+            for key in args.change:
+                change_object(root, key)
+            changed = True
+
+        logs = io.StringIO()
+        with contextlib.redirect_stdout(logs):
+            response = lambda_function.lambda_handler(event, None)
+        print(f"== {path} -> {response['statusCode']}")
+        if args.logs:
+            print(logs.getvalue(), end="")
+        print(json.dumps(json.loads(response["body"]), indent=2, ensure_ascii=False)[:2000])
+
+
+if __name__ == "__main__":
+    main()
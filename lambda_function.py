@@ -1,467 +1,2129 @@
-import json
-import boto3
-import time
-import re
-from collections import Counter
-from string import punctuation
-
-# AWS Clients
-s3 = boto3.client("s3")
-bedrock = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Stopwords for filtering
-STOPWORDS = set("""
-a an the and or in on of for with to from by at is was as are be this that which it its has have not their
-""".split())
-
-# ---------- UTILITIES ----------
-
-def read_file_from_s3(bucket, key):
-    print(f"Reading file: {key}")
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    return obj['Body'].read().decode('utf-8')
-
-def tokenize(text):
-    text = re.sub(rf"[{punctuation}]", "", text.lower())
-    tokens = text.split()
-    return [word for word in tokens if word not in STOPWORDS]
-
-def chunk_text(text, chunk_size=1000, overlap=200):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
-
-def score_chunk(chunk, question_tokens):
-    chunk_tokens = tokenize(chunk)
-    counter = Counter(chunk_tokens)
-    return sum(counter[token] for token in question_tokens)
-
-def find_best_chunks(text, question, top_n=3):
-    question_tokens = tokenize(question)
-    chunks = chunk_text(text)
-    scored_chunks = [(chunk, score_chunk(chunk, question_tokens)) for chunk in chunks]
-    sorted_chunks = sorted(scored_chunks, key=lambda x: x[1], reverse=True)
-    best_chunks = [chunk for chunk, score in sorted_chunks[:top_n]]
-    combined = "\n\n".join(best_chunks)
-    return combined[:6000]
-
-def ask_claude(context, question):
-    prompt = f"""Use the following college info to answer this question:\n\n{context}\n\nQuestion: {question}"""
-    time.sleep(1)
-    response = bedrock.invoke_model(
-        modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-        body=json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 500
-        }),
-        contentType="application/json",
-        accept="application/json"
-    )
-    return json.loads(response['body'].read())['content'][0]['text']
-
-# ---------- MAIN HANDLER ----------
-
-def lambda_handler(event, context):
-    # Safe access to query
-    question = event.get("queryStringParameters", {}).get("q", "").strip()
-    department = event.get("queryStringParameters", {}).get("department", "cse")
-    dept_prefix = department.lower() + "/"
-
-    if not question:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Missing query parameter 'q'"})
-        }
-
-    bucket = "college-ai-data"
-    filenames = [
-        "conferencepapers.json",
-        "courses.json",
-        "elective_courses.json",
-        "faculty.json",
-        "faqs.json",
-        "industry_projects.json",
-        "coursesyllabus.json",
-        "industrial_project_ideas.json",
-        "important_questions_links.json"
-    ]
-    keys = [dept_prefix + name for name in filenames]
-
-
-
-    try:
-        lower_q = question.lower()
-
-        # Faculty-related questions
-        faculty_keywords = ["faculty", "professor", "staff", "teacher", "hod"]
-        if any(word in lower_q for word in faculty_keywords):
-            print("→ Faculty-related question detected.")
-            dept_prefix = department.lower() + "/"  # example: "cse/"
-            faculty_text = read_file_from_s3(bucket, dept_prefix + "faculty.json")
-
-
-            faculty_data = json.loads(faculty_text)
-            if isinstance(faculty_data, dict):
-                faculty_data = faculty_data.get("faculty", [])
-
-            # If "list faculty" is asked
-            if "list" in lower_q and "faculty" in lower_q:
-                output = []
-                for i, faculty in enumerate(faculty_data, 1):
-                    name = faculty.get("Name", "Unknown")
-                    title = faculty.get("Title", "Faculty")
-                    output.append(f"{i}. {name} ({title})")
-
-                return {
-                    "statusCode": 200,
-                    "headers": {"Access-Control-Allow-Origin": "*"},
-                    "body": json.dumps({"answer": "Faculty Members:\n\n" + "\n".join(output)})
-                }
-
-            # Search for specific faculty by name
-            matched = []
-            for fac in faculty_data:
-                name = fac.get("Name", "").lower()
-                if any(part in lower_q for part in name.split()):
-                    matched.append(fac)
-
-            if matched:
-                formatted_list = []
-                for fac in matched:
-                    formatted = f"""Name: {fac.get("Name")}
-Title: {fac.get("Title")}
-Email: {fac.get("Email")}
-Phone: {fac.get("Phone")}
-Qualification: {fac.get("Qualification")}
-Research Interests: {fac.get("Research_Of_Interest")}
-Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
-                    formatted_list.append(formatted)
-
-                return {
-                    "statusCode": 200,
-                    "headers": {"Access-Control-Allow-Origin": "*"},
-                    "body": json.dumps({"answer": "\n\n".join(formatted_list)})
-                }
-
-            # If no match, fallback to Claude
-            combined_text = faculty_text
-            for key in keys:
-                if not key.endswith("faculty.json"):
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-
-
-        # Conference papers
-        if "conference" in lower_q or "paper" in lower_q or "authors" in lower_q:
-            print("→ Conference paper question detected.")
-            combined_text = read_file_from_s3(bucket, dept_prefix + "conferencepapers.json")+ "\n\n"
-            for key in keys:
-                if key != "conferencepapers.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-        # Project Topic Suggestions by Domain
-        project_keywords = [
-            "project topics", "project ideas", "mini project", "final year project", "domain projects",
-            "ai project", "iot project", "cloud project", "data science project", "cybersecurity project",
-            "blockchain project", "web development project", "mobile app project"
-        ]
-
-        if any(word in lower_q for word in project_keywords):
-            print("→ Project domain suggestion detected.")
-            project_data = json.loads(read_file_from_s3(bucket, dept_prefix + "industrial_project_ideas.json"))
-
-            matched_domains = []
-            response_lines = []
-
-            for domain in project_data:
-                if domain.lower() in lower_q:
-                    matched_domains.append(domain)
-
-            if matched_domains:
-                for domain in matched_domains:
-                    response_lines.append(f"🔷 **{domain} Projects:**")
-                    for topic in project_data[domain]:
-                        response_lines.append(f"• {topic}")
-                    response_lines.append("")  # Empty line for spacing
-            else:
-                # No specific domain matched – list all
-                for domain, topics in project_data.items():
-                    response_lines.append(f"🔷 **{domain} Projects:**")
-                    for topic in topics:
-                        response_lines.append(f"• {topic}")
-                    response_lines.append("")
-
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": "\n".join(response_lines)})
-            }
-        # ✅ Industry Projects
-        industry_keywords = [
-            "industry project", "industry projects", "company", "companies",
-            "internship", "internships", "collaboration", "collaborations",
-            "geons", "students involved",
-            "duration", "status"
-        ]
-
-        if any(word in lower_q for word in industry_keywords) or "project" in lower_q or "tell me about" in lower_q or "list" in lower_q:
-            print("→ Industry project question detected.")
-
-            # Read the industry projects JSON
-            try:
-                industry_json = read_file_from_s3(bucket, dept_prefix + "industry_projects.json")
-                projects = json.loads(industry_json)
-            except Exception as e:
-                return {
-                    "statusCode": 500,
-                    "headers": {"Access-Control-Allow-Origin": "*"},
-                    "body": json.dumps({"answer": f"❌ Failed to load project data: {str(e)}"})
-                }
-
-            matched_projects = []
-
-            # Match specific project name or general listing
-            for project in projects:
-                project_name = project.get("project_name", "").lower()
-                industry_name = project.get("industry_name", "").lower()
-                students = project.get("students_involved", "").lower()
-
-                if (
-                    project_name in lower_q
-                    or industry_name in lower_q
-                    or any(student.strip() in lower_q for student in students.split(","))
-                ):
-                    matched_projects.append(project)
-
-            # General listing of all if "list", "all", or "display" in query
-            if not matched_projects and any(word in lower_q for word in ["list", "all", "display", "show"]):
-                matched_projects = projects
-
-            # If we found matches, format nicely
-            if matched_projects:
-                lines = []
-                for proj in matched_projects:
-                    lines.append(
-                        f"🏭 *{proj.get('project_name', 'N/A')}* at _{proj.get('industry_name', 'N/A')}_\n"
-                        f"👨‍🎓 Students: {proj.get('students_involved', 'N/A')}\n"
-                        f"📅 Duration: {proj.get('duration', 'N/A')}\n"
-                        f"✅ Status: {proj.get('status', 'N/A')}\n"
-                    )
-                answer = "\n\n".join(lines)
-            else:
-                answer = "⚠️ Sorry, no matching industry project information found for your query."
-
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-
-
-        # FAQs and Vision/Mission
-        faq_keywords = ["vision", "mission", "outcome", "objectives", "goal", "department aim"]
-        if any(word in lower_q for word in faq_keywords):
-            print("→ FAQ/vision/mission question detected.")
-            combined_text = read_file_from_s3(bucket, dept_prefix + "faqs.json") + "\n\n"
-            for key in keys:
-                if key != "faqs.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-        
-        # 📘 Important Question Links (by semester or subject)
-        important_keywords = [
-            "important question", "important questions link", "important links", "youtube links",
-            "video links", "question links", "sem videos", "semester videos", "unit links"
-        ]
-
-        if any(word in lower_q for word in important_keywords):
-            print("→ Important question link request detected.")
-            link_data = json.loads(read_file_from_s3(bucket, dept_prefix + "important_questions_links.json"))
-
-            sem_map = {
-                "1": "Semester 1", "first": "Semester 1", "sem 1": "Semester 1",
-                "2": "Semester 2", "second": "Semester 2", "sem 2": "Semester 2",
-                "3": "Semester 3", "third": "Semester 3", "sem 3": "Semester 3",
-                "4": "Semester 4", "fourth": "Semester 4", "sem 4": "Semester 4",
-                "5": "Semester 5", "fifth": "Semester 5", "sem 5": "Semester 5",
-                "6": "Semester 6", "sixth": "Semester 6", "sem 6": "Semester 6",
-                "7": "Semester 7", "seventh": "Semester 7", "sem 7": "Semester 7",
-                "8": "Semester 8", "eighth": "Semester 8", "sem 8": "Semester 8",
-            }
-
-            # 🔍 1. Check for semester-level request (with better matching)
-            found_semester = None
-            for key, label in sem_map.items():
-                # Use whole-word regex match to avoid partial or fuzzy issues
-                if re.search(rf"\b{re.escape(key)}\b", lower_q):
-                    found_semester = label
-                    break
-
-            print(f"Resolved semester from query: {found_semester}")
-
-            if found_semester and found_semester in link_data:
-                links = link_data[found_semester]
-                response_lines = [f"🎓 **{found_semester} Important Question Links:**\n"]
-                for subject, url in links.items():
-                    response_lines.append(f"🔗 [{subject}]({url})")
-                return {
-                    "statusCode": 200,
-                    "headers": {"Access-Control-Allow-Origin": "*"},
-                    "body": json.dumps({"answer": "\n".join(response_lines)})
-                }
-
-
-            # 🔍 2. Check for subject-level request
-            for sem, subjects in link_data.items():
-                for subject, url in subjects.items():
-                    if subject.lower() in lower_q:
-                        return {
-                            "statusCode": 200,
-                            "headers": {"Access-Control-Allow-Origin": "*"},
-                            "body": json.dumps({
-                                "answer": f"🔗 **{subject}** ({sem})\n[Click here for Important Question Link]({url})"
-                            })
-                        }
-
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({
-                    "answer": "Sorry, I couldn't find the important question links for that subject or semester. Please check the spelling or try asking again!"
-                })
-            }
-        # Syllabus / Semester-wise Course Info
-        syllabus_keywords = [
-            "semester", "syllabus", "unit", "lesson", "topics", "subjects","units", 
-            "second sem", "third sem", "first sem", "fourth sem", "fifth sem", 
-            "sixth sem", "seventh sem", "eighth sem", "sem i", "sem ii", "sem iii",
-            "sem iv", "sem v", "sem vi", "sem vii", "sem viii"
-        ]
-
-        if any(word in lower_q for word in syllabus_keywords):
-            print("→ Syllabus or semester-wise question detected.")
-            syllabus_text = read_file_from_s3(bucket, dept_prefix + "coursesyllabus.json")
-            syllabus_data = json.loads(syllabus_text)
-
-            response_texts = []
-
-            # ✅ Iterate through all departments in the syllabus JSON
-            for dept_key, dept_syllabus in syllabus_data.items():
-                for semester, subjects in dept_syllabus.items():
-                    # Normalize semester name for matching
-                    normalized_sem = semester.lower().replace("_", " ")
-                    if normalized_sem in lower_q or semester[-1] in lower_q:
-                        response_texts.append(f"📘 **{dept_key.replace('_', ' ')} - {semester.replace('_', ' ')} Courses**:\n")
-                        for code, info in subjects.items():
-                            title = info.get("title", "Untitled")
-                            units = info.get("units", [])
-                            response_texts.append(f"🔹 {code} - {title}\nUnits:\n" + "\n".join([f"  - {unit}" for unit in units]) + "\n")
-
-            if response_texts:
-                return {
-                    "statusCode": 200,
-                    "headers": {"Access-Control-Allow-Origin": "*"},
-                    "body": json.dumps({"answer": "\n".join(response_texts)})
-                }
-
-            # 🔁 Fallback to Claude or LLM
-            combined_text = syllabus_text
-            for key in keys:
-                if key != "coursesyllabus.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-
-        # Course code (e.g., EP101)
-        if re.match(r"[A-Z]{2,4}\d{3}", question.strip().upper()):
-            print("→ Course code pattern detected.")
-            combined_text = (
-                read_file_from_s3(bucket, dept_prefix + "courses.json") + "\n\n" +
-                read_file_from_s3(bucket, dept_prefix + "elective_courses.json") + "\n\n"
-            )
-            for key in keys:
-                if key not in ["courses.json", "elective_courses.json"]:
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
-
-        if "elective courses" in lower_q or "open elective" in lower_q or "professional elective" in lower_q:
-            print("→ Elective courses query detected.")
-            elective_text = read_file_from_s3(bucket, dept_prefix + "elective_courses.json")
-            elective_data = json.loads(elective_text)
-
-            response_lines = ["📘 **Elective Courses Offered:**\n"]
-
-            for course in elective_data:
-                code = course.get("course_code", "N/A")
-                name = course.get("course_name", "N/A")
-                category = course.get("category", "N/A")
-                credits = course.get("credits", "N/A")
-                periods = course.get("periods_per_week", "N/A")
-
-                response_lines.append(f"🔹 {code} - {name} ({category}) – {credits} Credits – {periods}")
-
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": "\n".join(response_lines)})
-            }
-
-
-
-
-        # ✅ Default fallback if nothing matched
-        print("→ Default: combining all files.")
-        combined_text = ""
-        for key in keys:
-            combined_text += read_file_from_s3(bucket, key) + "\n\n"
-
-        best_context = find_best_chunks(combined_text, question)
-        answer = ask_claude(best_context, question)
-
-        return {
-            "statusCode": 200,
-            "headers": {"Access-Control-Allow-Origin": "*"},
-            "body": json.dumps({"answer": answer})
-        }
-
-    except Exception as e:
-        print("Error:", str(e))
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
-
+import base64
+import contextvars
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import threading
+import time
+import math
+import random
+import re
+import sqlite3
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import wraps
+from string import punctuation
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+
+# Parallel S3 reads (pool size, seconds allowed per key)
+S3_FETCH_WORKERS = int(os.environ.get("S3_FETCH_WORKERS", "10"))
+S3_FETCH_TIMEOUT = float(os.environ.get("S3_FETCH_TIMEOUT", "3"))
+
+# AWS Clients, created on first use so a cold start only pays for the ones it needs
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _client(name, create):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = create()
+    return client
+
+def s3_client():
+    # Shared by all fetch threads, so its connection pool is sized to match
+    def create():
+        import boto3
+        from botocore.config import Config
+        return boto3.client("s3", config=Config(
+            max_pool_connections=S3_FETCH_WORKERS,
+            connect_timeout=S3_FETCH_TIMEOUT,
+            read_timeout=S3_FETCH_TIMEOUT,
+            retries={"max_attempts": 2, "mode": "standard"},
+        ))
+    return _client("s3", create)
+
+def bedrock_client():
+    # Throttling is retried by invoke_bedrock() with the rate limiter's backoff, not by botocore
+    def create():
+        import boto3
+        from botocore.config import Config
+        return boto3.client("bedrock-runtime", region_name="us-east-1", config=Config(retries={"total_max_attempts": 1}))
+    return _client("bedrock", create)
+
+def set_backends(s3_client=None, bedrock_client=None):
+    """Replace the S3 and/or Bedrock clients, e.g. with the stand-ins in local_backends.py."""
+    with _clients_lock:
+        if s3_client is not None:
+            _clients["s3"] = s3_client
+        if bedrock_client is not None:
+            _clients["bedrock"] = bedrock_client
+
+# Corpus cache tuning (seconds before an entry is revalidated, total bytes kept)
+CORPUS_CACHE_TTL = float(os.environ.get("CORPUS_CACHE_TTL", "300"))
+CORPUS_CACHE_MAX_BYTES = int(os.environ.get("CORPUS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Seconds between ListObjectsV2 checks of a cached department for changed files (0 turns polling off)
+CORPUS_POLL_INTERVAL = float(os.environ.get("CORPUS_POLL_INTERVAL", "60"))
+
+# Corpus snapshot written by build_snapshot.py, loaded at cold start and checked against S3 in the background
+CORPUS_SNAPSHOT = os.environ.get(
+    "CORPUS_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_snapshot.pkl")
+)
+SNAPSHOT_VALIDATE = os.environ.get("SNAPSHOT_VALIDATE", "1") == "1"
+
+# Use retrieval indexes built by build_index.py when they match the file's ETag.
+# Off by default: each first index build then costs an extra GET, which only
+# pays off for files large enough that indexing takes longer than the read.
+LOAD_SHIPPED_INDEXES = os.environ.get("LOAD_SHIPPED_INDEXES", "0") == "1"
+
+# Retrieval: "count" (raw term counts) or "bm25", and the minimum score a chunk needs
+RETRIEVER = os.environ.get("RETRIEVER", "count")
+BM25_K1 = float(os.environ.get("BM25_K1", "1.2"))
+BM25_B = float(os.environ.get("BM25_B", "0.75"))
+MIN_RELEVANCE = float(os.environ.get("MIN_RELEVANCE", "0"))
+
+# Answer cache for Claude fallbacks: "memory", "sqlite" or "off"
+ANSWER_CACHE = os.environ.get("ANSWER_CACHE", "memory")
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", "/tmp/answer_cache.sqlite3")
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+# Claude prompts: input tokens per fallback (instructions, question and context) and the
+# default answer length for intents that do not set their own max_tokens
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1500"))
+CLAUDE_MAX_TOKENS = int(os.environ.get("CLAUDE_MAX_TOKENS", "500"))
+
+# Bedrock budget (requests/sec, tokens/min) and retries on throttling
+BEDROCK_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+BEDROCK_RPS = float(os.environ.get("BEDROCK_RPS", "1"))
+BEDROCK_TPM = float(os.environ.get("BEDROCK_TPM", "200000"))
+BEDROCK_MAX_RETRIES = int(os.environ.get("BEDROCK_MAX_RETRIES", "4"))
+BEDROCK_BACKOFF_BASE = float(os.environ.get("BEDROCK_BACKOFF_BASE", "0.5"))
+BEDROCK_BACKOFF_MAX = float(os.environ.get("BEDROCK_BACKOFF_MAX", "8"))
+RETRYABLE_BEDROCK_ERRORS = ("ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException")
+
+# Batch requests (POST): questions answered concurrently, and the most questions and
+# distinct departments accepted per request
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_QUESTIONS = int(os.environ.get("BATCH_MAX_QUESTIONS", "50"))
+BATCH_MAX_DEPARTMENTS = int(os.environ.get("BATCH_MAX_DEPARTMENTS", "8"))
+# Seconds a batch may wait for the Bedrock budget; later Claude fallbacks are deferred
+# (kept under API Gateway's 29 s integration timeout)
+BATCH_TIME_BUDGET = float(os.environ.get("BATCH_TIME_BUDGET", "20"))
+
+# Cross-department questions (department=cse,it,...): the most departments one question may span
+FANOUT_MAX_DEPARTMENTS = int(os.environ.get("FANOUT_MAX_DEPARTMENTS", "8"))
+
+# Request metrics: one EMF log line per request, and optionally a Server-Timing response header
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "CollegeChatbot")
+METRICS_LOG = os.environ.get("METRICS_LOG", "1") == "1"
+METRICS_HEADER = os.environ.get("METRICS_HEADER", "0") == "1"
+
+BUCKET = "college-ai-data"
+FILENAMES = [
+    "conferencepapers.json",
+    "courses.json",
+    "elective_courses.json",
+    "faculty.json",
+    "faqs.json",
+    "industry_projects.json",
+    "coursesyllabus.json",
+    "industrial_project_ideas.json",
+    "important_questions_links.json"
+]
+
+# Stopwords for filtering
+STOPWORDS = set("""
+a an the and or in on of for with to from by at is was as are be this that which it its has have not their
+""".split())
+
+# ---------- METRICS ----------
+
+class RequestMetrics:
+    """Stage timings and counters for one request.
+
+    Time spent in a stage adds up over the request (every S3 read adds to
+    "s3_read"), including work done on pool threads started with
+    submit_in_context(). Counters and per-read details follow the same rule.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = Counter()  # stage -> milliseconds
+        self.counts = Counter()
+        self.properties = {}
+        self.s3_reads = []  # (key, outcome, milliseconds, bytes)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, (time.perf_counter() - start) * 1000)
+
+    def add_time(self, name, ms):
+        with self._lock:
+            self.stages[name] += ms
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def s3_read(self, key, outcome, ms, size=0):
+        """Record one read of `key`: "cached" (no S3 call), "revalidated" (304), "fetched" or "error"."""
+        with self._lock:
+            self.s3_reads.append((key, outcome, round(ms, 2), size))
+            self.stages["s3_read"] += ms
+            self.counts[f"s3_{outcome}"] += 1
+            self.counts["s3_bytes"] += size
+
+    def set(self, **properties):
+        with self._lock:
+            self.properties.update(properties)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def emf(self):
+        """The request as a CloudWatch Embedded Metric Format record, dimensioned by intent."""
+        total = self.total_ms()
+        with self._lock:
+            values = {f"{name}_ms": round(ms, 2) for name, ms in self.stages.items()}
+            values["total_ms"] = round(total, 2)
+            values.update(self.counts)
+            definitions = [
+                {"Name": name, "Unit": "Milliseconds" if name.endswith("_ms") else "Bytes" if name.endswith("_bytes") else "Count"}
+                for name in values
+            ]
+            reads = [{"key": k, "outcome": o, "ms": ms, "bytes": b} for k, o, ms, b in self.s3_reads]
+            properties = dict(self.properties)
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{"Namespace": METRICS_NAMESPACE, "Dimensions": [["intent"]], "Metrics": definitions}],
+            },
+            "intent": "none",
+            **properties,
+            **values,
+            "s3_reads": reads,
+            "corpus_cache_hit_ratio": corpus_cache.stats()["hit_ratio"],
+            "answer_cache_hit_ratio": answer_cache.stats()["hit_ratio"],
+        }
+
+    def server_timing(self):
+        """Stage timings as a Server-Timing header value."""
+        with self._lock:
+            stages = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        return ", ".join(stages + [f"total;dur={self.total_ms():.1f}"])
+
+
+_current_metrics = contextvars.ContextVar("request_metrics", default=None)
+
+def metrics():
+    """RequestMetrics of the request being handled (a throwaway one outside a request)."""
+    return _current_metrics.get() or RequestMetrics()
+
+@contextmanager
+def request_metrics():
+    """Record metrics for the request handled in the block, then log them as one EMF line."""
+    recorded = RequestMetrics()
+    token = _current_metrics.set(recorded)
+    try:
+        yield recorded
+    finally:
+        _current_metrics.reset(token)
+        if METRICS_LOG:
+            print(json.dumps(recorded.emf()))
+
+def timed(stage):
+    """Decorator adding the function's running time to `stage` of the current request."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics().stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def submit_in_context(pool, func, *args):
+    """pool.submit() that keeps the caller's request metrics on the worker thread."""
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+def map_in_context(pool, func, items):
+    """pool.map() over `items` that keeps the caller's request metrics."""
+    futures = [submit_in_context(pool, func, item) for item in items]
+    return [future.result() for future in futures]
+
+# ---------- CORPUS CACHE ----------
+
+def approx_size(value):
+    """Rough in-memory size of `value` in bytes (its pickled length), for cache budgets."""
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+class CorpusCache:
+    """Department files kept in memory across warm invocations.
+
+    Entries are grouped per department (the key prefix, e.g. "cse") and
+    departments are evicted least-recently-used once the cache holds more
+    than `max_bytes`, counting each file's text and the approximate size of
+    the data derived from it. An entry older than `ttl` seconds is
+    revalidated against S3 with its ETag before being served again.
+    """
+
+    def __init__(self, max_bytes=CORPUS_CACHE_MAX_BYTES, ttl=CORPUS_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._departments = OrderedDict()  # dept -> {(bucket, key): entry}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def department_of(key):
+        return key.split("/", 1)[0] if "/" in key else ""
+
+    def get(self, bucket, key):
+        """Return the cached entry for `key` (fresh or stale) or None."""
+        dept = self.department_of(key)
+        with self._lock:
+            files = self._departments.get(dept)
+            if files is None:
+                return None
+            self._departments.move_to_end(dept)
+            return files.get((bucket, key))
+
+    def is_fresh(self, entry):
+        return time.time() - entry["checked_at"] < self.ttl
+
+    def put(self, bucket, key, text, etag, size, derived=None):
+        dept = self.department_of(key)
+        derived = dict(derived or {})
+        entry = {
+            "bucket": bucket, "key": key, "text": text, "etag": etag, "size": size,
+            "bytes": size + sum(approx_size(value) for value in derived.values()),
+            "checked_at": time.time(), "derived": derived,
+        }
+        with self._lock:
+            files = self._departments.setdefault(dept, {})
+            previous = files.get((bucket, key))
+            files[(bucket, key)] = entry
+            self._sizes[dept] = self._sizes.get(dept, 0) + entry["bytes"] - (previous["bytes"] if previous else 0)
+            self._departments.move_to_end(dept)
+            self._evict()
+        return entry
+
+    def discard(self, bucket, key):
+        """Drop the entry for `key`, e.g. after the object was deleted."""
+        dept = self.department_of(key)
+        with self._lock:
+            files = self._departments.get(dept, {})
+            entry = files.pop((bucket, key), None)
+            if entry is not None:
+                self._sizes[dept] -= entry["bytes"]
+            if dept in self._departments and not files:
+                del self._departments[dept]
+                self._sizes.pop(dept, None)
+        return entry is not None
+
+    def keys(self, department):
+        """(bucket, key) of every cached file of `department`."""
+        with self._lock:
+            return list(self._departments.get(department, {}))
+
+    def derived(self, entry, name, build):
+        """Return data computed from `entry`'s text, building it on first use.
+
+        Derived data lives on the entry itself, so it is dropped together
+        with the text when the file changes or its department is evicted.
+        Its approximate size counts towards the department's budget.
+        """
+        with self._lock:
+            if name in entry["derived"]:
+                return entry["derived"][name]
+        value = build()
+        size = approx_size(value)
+        with self._lock:
+            if name in entry["derived"]:
+                return entry["derived"][name]
+            entry["derived"][name] = value
+            entry["bytes"] += size
+            dept = self.department_of(entry["key"])
+            if self._departments.get(dept, {}).get((entry["bucket"], entry["key"])) is entry:
+                self._sizes[dept] += size
+                self._departments.move_to_end(dept)
+                self._evict()
+            return value
+
+    def revalidated(self, entry):
+        with self._lock:
+            entry["checked_at"] = time.time()
+            self.revalidations += 1
+
+    def _evict(self):
+        # Never evict the department that was just used, even if it alone exceeds the budget
+        while sum(self._sizes.values()) > self.max_bytes and len(self._departments) > 1:
+            dept, _ = self._departments.popitem(last=False)
+            self._sizes.pop(dept, None)
+            self.evictions += 1
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "departments": list(self._departments),
+                "bytes": sum(self._sizes.values()),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._departments.clear()
+            self._sizes.clear()
+
+
+corpus_cache = CorpusCache()
+
+# ---------- UTILITIES ----------
+
+def read_file_from_s3(bucket, key, revalidate=False):
+    """Text of `key`, from the corpus cache while fresh (unless `revalidate`) or else from S3."""
+    entry = corpus_cache.get(bucket, key)
+    if entry and not revalidate and corpus_cache.is_fresh(entry):
+        corpus_cache.record(hit=True)
+        metrics().s3_read(key, "cached", 0.0)
+        return entry["text"]
+
+    params = {"Bucket": bucket, "Key": key}
+    if entry and entry["etag"]:
+        params["IfNoneMatch"] = entry["etag"]
+
+    print(f"Reading file: {key}")
+    start = time.perf_counter()
+    try:
+        obj = s3_client().get_object(**params)
+    except ClientError as e:
+        # 304 means our copy is still current
+        if entry and e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+            metrics().s3_read(key, "revalidated", (time.perf_counter() - start) * 1000)
+            corpus_cache.revalidated(entry)
+            corpus_cache.record(hit=True)
+            return entry["text"]
+        metrics().s3_read(key, "error", (time.perf_counter() - start) * 1000)
+        raise
+
+    raw = obj['Body'].read()
+    metrics().s3_read(key, "fetched", (time.perf_counter() - start) * 1000, len(raw))
+    corpus_cache.record(hit=False)
+    entry = corpus_cache.put(bucket, key, raw.decode('utf-8'), obj.get("ETag"), len(raw))
+    return entry["text"]
+
+_fetch_pool = ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS, thread_name_prefix="s3-fetch")
+
+def fetch_many(bucket, keys, timeout=S3_FETCH_TIMEOUT):
+    """Read several keys concurrently.
+
+    Returns (texts, failed): texts maps each key that was read to its
+    contents, failed maps every other key to the reason it was skipped
+    (missing object, S3 error or no answer within `timeout` seconds).
+    """
+    futures = {submit_in_context(_fetch_pool, read_file_from_s3, bucket, key): key for key in keys}
+    done, _ = wait(futures, timeout=timeout)
+
+    texts, failed = {}, {}
+    for future, key in futures.items():
+        if future not in done:
+            failed[key] = f"timed out after {timeout}s"
+        elif future.exception() is not None:
+            failed[key] = str(future.exception())
+        else:
+            texts[key] = future.result()
+    for key, reason in failed.items():
+        print(f"Skipping {key}: {reason}")
+    return texts, failed
+
+def read_once(bucket, key, fetched):
+    """Read `key` unless this request already has it in `fetched`."""
+    if key not in fetched:
+        fetched[key] = read_file_from_s3(bucket, key)
+    return fetched[key]
+
+def tokenize(text):
+    text = re.sub(rf"[{punctuation}]", "", text.lower())
+    tokens = text.split()
+    return [word for word in tokens if word not in STOPWORDS]
+
+def chunk_text(text, chunk_size=1000, overlap=200):
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        chunks.append(text[start:end])
+        start += chunk_size - overlap
+    return chunks
+
+def _is_scalar(value):
+    return not isinstance(value, (dict, list))
+
+def _field_text(value):
+    # Some fields (e.g. faculty Achievements) hold a JSON-encoded list
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+def json_records(data, path=()):
+    """Yield (path, fields) for every logical entity in parsed department JSON.
+
+    Dicts and lists of nested objects are containers (a dict key such as a
+    semester or course code becomes part of the path); a dict's scalar
+    fields, or a list of plain values, form one entity.
+    """
+    if isinstance(data, list):
+        if all(_is_scalar(item) for item in data):
+            if data:
+                yield path, {"items": data}
+            return
+        for item in data:
+            yield from json_records(item, path)
+    elif isinstance(data, dict):
+        fields = {k: v for k, v in data.items() if _is_scalar(v) or (isinstance(v, list) and all(map(_is_scalar, v)))}
+        if not any(_is_scalar(v) for v in fields.values()):
+            # Only lists of plain values (e.g. domain -> project ideas): each list is its own entity
+            fields = {}
+        if fields:
+            yield path, fields
+        for k, v in data.items():
+            if k not in fields:
+                yield from json_records(v, path + (str(k),))
+    else:
+        yield path, {"value": data}
+
+def chunk_json(text, label, max_chars=1000):
+    """One compact text record per entity of a department JSON file.
+
+    Each record starts with "[<label>]" (department/file) and the entity's
+    path, followed by its fields; records longer than `max_chars` are split.
+    Returns None when `text` is not JSON.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+
+    records = []
+    for path, fields in json_records(data):
+        header = f"[{label}]" + "".join(f" {p.replace('_', ' ')} >" for p in path)
+        body = " | ".join(
+            _field_text(v) if k in ("items", "value") else f"{k.replace('_', ' ')}: {_field_text(v)}"
+            for k, v in fields.items()
+        )
+        record = f"{header} {body}"
+        if len(record) <= max_chars:
+            records.append(record)
+        else:
+            part_size = max(max_chars - len(header) - 1, max_chars // 2)
+            records.extend(f"{header} {part}" for part in chunk_text(body, part_size, 0))
+    return records
+
+# ---------- RETRIEVAL INDEX ----------
+
+INDEX_VERSION = 2
+
+def index_key_for(key):
+    """S3 key of the prebuilt index shipped next to a department file."""
+    return (key[:-len(".json")] if key.endswith(".json") else key) + ".idx.json"
+
+def source_label(key):
+    """Department/file label used in chunk headers, e.g. "cse/faculty"."""
+    return key[:-len(".json")] if key.endswith(".json") else key
+
+@timed("chunking")
+def build_index(text, source_etag=None, label=None, chunk_size=1000, overlap=200):
+    """Chunk one file and index it: term -> [[chunk_id, term_frequency], ...].
+
+    With a `label` the file is chunked per JSON entity (chunk_json); text
+    that is not JSON falls back to fixed windows (chunk_text). The result is
+    plain JSON so it can be written with dump_index() and shipped to S3 next
+    to the file it was built from.
+    """
+    chunks = chunk_json(text, label, chunk_size) if label else None
+    chunker = "json" if chunks is not None else "text"
+    if chunks is None:
+        chunks = chunk_text(text, chunk_size, overlap)
+    postings = {}
+    lengths = []
+    for chunk_id, chunk in enumerate(chunks):
+        counts = Counter(tokenize(chunk))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([chunk_id, tf])
+    return {
+        "version": INDEX_VERSION,
+        "source_etag": source_etag,
+        "chunker": chunker,
+        "chunk_size": chunk_size,
+        "overlap": overlap,
+        "chunks": chunks,
+        "lengths": lengths,
+        "postings": postings,
+    }
+
+def dump_index(index):
+    return json.dumps(index, separators=(",", ":"))
+
+def load_index(data):
+    index = json.loads(data)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"Unsupported index version: {index.get('version')}")
+    return index
+
+def load_shipped_index(bucket, key, etag):
+    """Prebuilt index for `key` from S3, or None if absent or built from another version."""
+    if not LOAD_SHIPPED_INDEXES or not etag:
+        return None
+    start = time.perf_counter()
+    try:
+        obj = s3_client().get_object(Bucket=bucket, Key=index_key_for(key))
+        data = obj['Body'].read()
+        metrics().s3_read(index_key_for(key), "fetched", (time.perf_counter() - start) * 1000, len(data))
+        index = load_index(data)
+    except (ClientError, ValueError) as e:
+        if isinstance(e, ClientError):
+            metrics().s3_read(index_key_for(key), "error", (time.perf_counter() - start) * 1000)
+        print(f"No usable index for {key}: {e}")
+        return None
+    if index.get("source_etag") != etag:
+        print(f"Index for {key} is stale, rebuilding")
+        return None
+    return index
+
+def get_file_index(bucket, key, text):
+    """Index for one department file, kept on its cache entry between requests."""
+    entry = corpus_cache.get(bucket, key)
+    if entry is None or entry["text"] is not text:
+        return build_index(text, label=source_label(key))
+    return corpus_cache.derived(
+        entry, "index",
+        lambda: load_shipped_index(bucket, key, entry["etag"]) or build_index(text, entry["etag"], source_label(key))
+    )
+
+@timed("scoring")
+def search_index(indexes, question_tokens, top_n=3):
+    """Best `top_n` (chunk, score) pairs across `indexes`, scored by counting question tokens in the chunk.
+
+    Only the postings of the question tokens are visited, so only chunks
+    containing one of them are returned. Ties keep corpus order (earlier
+    index, then earlier chunk), as the full sort did.
+    """
+    candidates = []
+    for order, index in enumerate(indexes):
+        scores = Counter()
+        for token in question_tokens:
+            for chunk_id, tf in index["postings"].get(token, ()):
+                scores[chunk_id] += tf
+        candidates.extend((score, order, chunk_id) for chunk_id, score in scores.items())
+    best = heapq.nsmallest(top_n, candidates, key=lambda c: (-c[0], c[1], c[2]))
+    return [(indexes[order]["chunks"][chunk_id], score) for score, order, chunk_id in best]
+
+# ---------- BM25 ----------
+
+class TermMatrix:
+    """Sparse term-by-chunk matrix of one index, used for BM25 scoring.
+
+    With NumPy the postings are stored row-wise (CSR): row `vocab[term]`
+    covers chunk_ids[indptr[row]:indptr[row + 1]] with matching term
+    frequencies in `tfs`. Without NumPy the index postings are used as-is.
+    NumPy is imported by the first matrix, so cold starts that never use
+    BM25 do not pay for it.
+    """
+
+    _numpy = None  # the numpy module, or False when it is not installed
+
+    @classmethod
+    def numpy(cls):
+        if cls._numpy is None:
+            try:
+                import numpy
+                cls._numpy = numpy
+            except ImportError:  # BM25 falls back to walking the postings lists
+                cls._numpy = False
+        return cls._numpy or None
+
+    @timed("indexing")
+    def __init__(self, index):
+        self.postings = index["postings"]
+        self.chunks = index["chunks"]
+        self.lengths = index["lengths"]
+        np = self.numpy()
+        if np is None:
+            return
+        self.vocab = {}
+        indptr = [0]
+        chunk_ids, tfs = [], []
+        for row, (term, postings) in enumerate(self.postings.items()):
+            self.vocab[term] = row
+            for chunk_id, tf in postings:
+                chunk_ids.append(chunk_id)
+                tfs.append(tf)
+            indptr.append(len(chunk_ids))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.tfs = np.asarray(tfs, dtype=np.float64)
+        self.length_array = np.asarray(self.lengths, dtype=np.float64)
+
+    def document_frequency(self, term):
+        return len(self.postings.get(term, ()))
+
+    def score(self, weights, avgdl, k1, b):
+        """{chunk_id: score} for the query weights {term: idf * query_count}."""
+        np = self.numpy()
+        if np is None:
+            scores = Counter()
+            for term, weight in weights.items():
+                for chunk_id, tf in self.postings.get(term, ()):
+                    norm = k1 * (1 - b + b * self.lengths[chunk_id] / avgdl)
+                    scores[chunk_id] += weight * tf * (k1 + 1) / (tf + norm)
+            return scores
+
+        # Gather the rows of all query terms and score them in a single pass
+        terms = [term for term in weights if term in self.vocab]
+        if not terms:
+            return {}
+        spans = [np.arange(self.indptr[self.vocab[t]], self.indptr[self.vocab[t] + 1]) for t in terms]
+        positions = np.concatenate(spans)
+        term_weight = np.repeat([weights[t] for t in terms], [len(span) for span in spans])
+        ids = self.chunk_ids[positions]
+        tf = self.tfs[positions]
+        norm = k1 * (1 - b + b * self.length_array[ids] / avgdl)
+        scores = np.bincount(ids, weights=term_weight * tf * (k1 + 1) / (tf + norm), minlength=len(self.chunks))
+        matched = np.flatnonzero(scores)
+        return dict(zip(matched.tolist(), scores[matched].tolist()))
+
+def get_term_matrix(bucket, key, text):
+    """TermMatrix for one department file, kept on its cache entry like the index."""
+    entry = corpus_cache.get(bucket, key)
+    if entry is None or entry["text"] is not text:
+        return TermMatrix(get_file_index(bucket, key, text))
+    return corpus_cache.derived(entry, "matrix", lambda: TermMatrix(get_file_index(bucket, key, text)))
+
+@timed("scoring")
+def search_bm25(matrices, question_tokens, top_n=3, k1=BM25_K1, b=BM25_B, min_score=0.0):
+    """Best `top_n` (chunk, score) pairs across `matrices` ranked by BM25.
+
+    Collection statistics (document frequencies, average chunk length) are
+    taken over all matrices together. Only chunks scoring above `min_score`
+    are returned, so a question with no matching terms gets no chunks.
+    """
+    total_chunks = sum(len(m.chunks) for m in matrices)
+    if not total_chunks:
+        return []
+    avgdl = (sum(sum(m.lengths) for m in matrices) / total_chunks) or 1.0
+
+    weights = {}
+    for term, count in Counter(question_tokens).items():
+        df = sum(m.document_frequency(term) for m in matrices)
+        if df:
+            weights[term] = count * math.log(1 + (total_chunks - df + 0.5) / (df + 0.5))
+
+    candidates = []
+    for order, matrix in enumerate(matrices):
+        scores = matrix.score(weights, avgdl, k1, b)
+        candidates.extend((score, order, chunk_id) for chunk_id, score in scores.items() if score > min_score)
+    best = heapq.nsmallest(top_n, candidates, key=lambda c: (-c[0], c[1], c[2]))
+    return [(matrices[order].chunks[chunk_id], score) for score, order, chunk_id in best]
+
+def rank_chunks(bucket, keys, fetched, question, top_n=3, retriever=None, min_score=None):
+    """(chunk, score) pairs for `question` over the files `keys` (texts in `fetched`).
+
+    `retriever` is "count" (raw question term counts) or "bm25" and
+    defaults to RETRIEVER; only chunks scoring above `min_score` (default
+    MIN_RELEVANCE) are kept.
+    """
+    retriever = retriever or RETRIEVER
+    min_score = MIN_RELEVANCE if min_score is None else min_score
+    question_tokens = tokenize(question)
+
+    if retriever == "bm25":
+        matrices = map_in_context(_fetch_pool, lambda key: get_term_matrix(bucket, key, fetched[key]), keys)
+        return search_bm25(matrices, question_tokens, top_n, min_score=min_score)
+
+    indexes = map_in_context(_fetch_pool, lambda key: get_file_index(bucket, key, fetched[key]), keys)
+    return [(chunk, score) for chunk, score in search_index(indexes, question_tokens, top_n) if score > min_score]
+
+def find_best_chunks_indexed(bucket, keys, fetched, question, top_n=12, budget=PROMPT_TOKEN_BUDGET):
+    """Context for `question` from the indexed files `keys` (texts in `fetched`).
+
+    Instead of cutting the joined text at a character limit, the best ranked
+    chunks that fit in the prompt's token `budget` are packed in whole.
+    """
+    ranked = [chunk for chunk, score in rank_chunks(bucket, keys, fetched, question, top_n)]
+    return "\n\n".join(pack_chunks(ranked, budget - estimate_tokens(build_prompt("", question))))
+
+# ---------- CONTEXT ASSEMBLY ----------
+
+def file_version(bucket, key, text):
+    """ETag of the cached file `key` if `text` is its cached copy, else a hash of `text`."""
+    entry = corpus_cache.get(bucket, key)
+    if entry is not None and entry["text"] is text and entry["etag"]:
+        return entry["etag"].strip('"')
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+def assemble_context(bucket, dept_prefixes, primary, also=FILENAMES, fetched=None):
+    """Join the primary files first and then the `also` files into one context.
+
+    File names are relative to each of `dept_prefixes` (one or several
+    departments, interleaved file by file); each key is read at most once
+    per request (texts already read by the caller can be passed in `fetched`)
+    and the keys not yet read, across all departments, are fetched in
+    parallel. A file with the same content as an earlier one (a syllabus
+    shared by departments) is only used once. Files that cannot be read are
+    left out; an error is raised only when none of them can be read.
+    Returns the keys that were read, in context order, with their texts in
+    `fetched`.
+    """
+    fetched = {} if fetched is None else fetched
+    keys = []
+    for name in list(primary) + list(also):
+        for dept_prefix in dept_prefixes:
+            key = dept_prefix + name
+            if key not in keys:
+                keys.append(key)
+
+    missing = [key for key in keys if key not in fetched]
+    texts, failed = fetch_many(bucket, missing)
+    fetched.update(texts)
+    # Only reads that went to S3 count, not corpus cache hits
+    bytes_fetched = sum(
+        size for key, outcome, _, size in list(metrics().s3_reads) if outcome == "fetched" and key in missing
+    )
+
+    distinct, versions = [], set()
+    for key in keys:
+        if key not in fetched:
+            continue
+        version = file_version(bucket, key, fetched[key])
+        if version not in versions:
+            versions.add(version)
+            distinct.append(key)
+    if not distinct and failed:
+        raise RuntimeError(f"Could not read any of: {', '.join(failed)}")
+
+    print(f"Context: {len(distinct)} files, {bytes_fetched} bytes fetched")
+    return distinct
+
+# ---------- PROMPT BUILDER ----------
+
+# Word pieces of estimate_tokens(): letter runs, digit groups and single symbols
+TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+MIN_OVERLAP_CHARS = 40
+
+def build_prompt(context, question):
+    return f"""Use the following college info to answer this question:\n\n{context}\n\nQuestion: {question}"""
+
+def estimate_tokens(text):
+    """Approximate Claude token count of `text`.
+
+    Letter runs count one token per six letters (short words are one
+    token), digits one per group of three and every other symbol one. This
+    errs on the high side for JSON-like text, where len(text) / 4 runs low.
+    """
+    tokens = 0
+    for piece in TOKEN_PIECES.findall(text):
+        tokens += (len(piece) + 5) // 6 if piece[0].isalpha() else 1
+    return max(1, tokens)
+
+def _overlap(head, tail, min_chars=MIN_OVERLAP_CHARS):
+    """Length of the longest end of `head` that starts `tail` (at least `min_chars`), else 0."""
+    if len(head) < min_chars or len(tail) < min_chars:
+        return 0
+    probe = tail[:min_chars]
+    start = head.find(probe)
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+def pack_chunks(ranked, budget):
+    """Greedily pack `ranked` chunks (best first) into `budget` tokens.
+
+    Chunks already contained in a packed one are skipped, and chunks that
+    overlap a packed one (the 200-character overlap of chunk_text windows)
+    are merged into it, so repeated text is only paid for once. A chunk that
+    does not fit is skipped whole rather than cut; smaller ones may follow.
+    """
+    packed, used = [], 0
+    for chunk in ranked:
+        if any(chunk in piece for piece in packed):
+            continue
+        merged = None
+        for i, piece in enumerate(packed):
+            after = _overlap(piece, chunk)
+            before = 0 if after else _overlap(chunk, piece)
+            if after or before:
+                merged = (i, piece + chunk[after:] if after else chunk + piece[before:])
+                break
+        if merged:
+            i, text = merged
+            cost = estimate_tokens(text) - estimate_tokens(packed[i])
+        else:
+            text = chunk
+            cost = estimate_tokens(chunk) + 1  # the blank line between chunks
+        if used + cost > budget:
+            continue
+        if merged:
+            packed[i] = text
+        else:
+            packed.append(text)
+        used += cost
+    metrics().count("context_tokens", used)
+    return packed
+
+# ---------- BEDROCK ----------
+
+class BedrockDeferred(RuntimeError):
+    """The Bedrock budget cannot serve a call before the request's deadline."""
+
+
+class RateLimiter:
+    """Token buckets for the Bedrock request rate and token throughput.
+
+    acquire() only sleeps when one of the budgets is exhausted. After a
+    throttling error the request rate is halved (down to an eighth of the
+    configured rate) and it recovers gradually with each success.
+    `clock` and `sleep` can be replaced to drive the limiter in tests.
+    """
+
+    def __init__(self, requests_per_second=BEDROCK_RPS, tokens_per_minute=BEDROCK_TPM,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.tokens_per_second = tokens_per_minute / 60
+        self.request_capacity = max(1.0, requests_per_second)
+        self.token_capacity = tokens_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttles = 0
+        self.backoff_seconds = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.rate)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.tokens_per_second)
+
+    def acquire(self, tokens=0, deadline=None):
+        """Take one request and `tokens` tokens, waiting if needed. Returns seconds waited.
+
+        Raises BedrockDeferred instead of waiting past `deadline` (a `clock` time).
+        """
+        tokens = min(tokens, self.token_capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    if waited:
+                        self.waits += 1
+                        self.wait_seconds += waited
+                    return waited
+                delay = max(
+                    (1 - self._requests) / self.rate,
+                    (tokens - self._tokens) / self.tokens_per_second,
+                    0.001
+                )
+                if deadline is not None and self.clock() + delay > deadline:
+                    raise BedrockDeferred(f"Bedrock budget is used up for the next {delay:.1f}s")
+            self.sleep(delay)
+            waited += delay
+
+    def backoff(self, attempt):
+        """Record a throttling error and sleep a jittered exponential delay."""
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.max_rate / 8, self.rate / 2)
+        delay = random.uniform(0, min(BEDROCK_BACKOFF_MAX, BEDROCK_BACKOFF_BASE * 2 ** attempt))
+        self.sleep(delay)
+        with self._lock:
+            self.backoff_seconds += delay
+        return delay
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "throttles": self.throttles,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "rate": self.rate,
+            }
+
+
+bedrock_limiter = RateLimiter()
+_bedrock_deadline = contextvars.ContextVar("bedrock_deadline", default=None)
+
+def invoke_bedrock(body, estimated_tokens, operation="invoke_model"):
+    """Call Bedrock within the rate budget, retrying throttling errors with backoff.
+
+    Returns (response, sent): `sent` is the perf_counter() time the
+    successful call was made. Only the calls themselves are timed as the
+    "bedrock" stage; limiter waits and backoff go to "bedrock_wait".
+    """
+    for attempt in range(BEDROCK_MAX_RETRIES + 1):
+        metrics().add_time("bedrock_wait", bedrock_limiter.acquire(estimated_tokens, _bedrock_deadline.get()) * 1000)
+        metrics().count("bedrock_calls")
+        sent = time.perf_counter()
+        try:
+            with metrics().stage("bedrock"):
+                response = getattr(bedrock_client(), operation)(
+                    modelId=BEDROCK_MODEL_ID,
+                    body=body,
+                    contentType="application/json",
+                    accept="application/json"
+                )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code not in RETRYABLE_BEDROCK_ERRORS or attempt == BEDROCK_MAX_RETRIES:
+                raise
+            delay = bedrock_limiter.backoff(attempt)
+            metrics().count("bedrock_retries")
+            metrics().add_time("bedrock_wait", delay * 1000)
+            print(f"Bedrock {code}, retry {attempt + 1} after {delay:.2f}s")
+            continue
+        bedrock_limiter.succeeded()
+        return response, sent
+
+def _claude_request(context, question, max_tokens=CLAUDE_MAX_TOKENS):
+    prompt = build_prompt(context, question)
+    body = json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens
+    })
+    return body, estimate_tokens(prompt) + max_tokens
+
+def _record_usage(usage):
+    metrics().count("input_tokens", usage.get("input_tokens", 0))
+    metrics().count("output_tokens", usage.get("output_tokens", 0))
+
+def ask_claude(context, question, max_tokens=CLAUDE_MAX_TOKENS):
+    body, estimated_tokens = _claude_request(context, question, max_tokens)
+    metrics().count("prompt_chars", len(context) + len(question))
+    response, _ = invoke_bedrock(body, estimated_tokens)
+    result = json.loads(response['body'].read())
+    _record_usage(result.get("usage", {}))
+    return result['content'][0]['text']
+
+def ask_claude_stream(context, question, max_tokens=CLAUDE_MAX_TOKENS):
+    """Like ask_claude, but yields the answer text as Bedrock generates it."""
+    body, estimated_tokens = _claude_request(context, question, max_tokens)
+    metrics().count("prompt_chars", len(context) + len(question))
+    response, sent = invoke_bedrock(body, estimated_tokens, operation="invoke_model_with_response_stream")
+    started = time.perf_counter()
+    try:
+        first = True
+        for event in response['body']:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            data = json.loads(chunk['bytes'])
+            if data.get("type") == "message_start":
+                _record_usage(data.get("message", {}).get("usage", {}))
+            elif data.get("type") == "message_delta":
+                _record_usage(data.get("usage", {}))
+            if data.get("type") == "content_block_delta" and data["delta"].get("type") == "text_delta":
+                if first:
+                    first_token_ms = (time.perf_counter() - sent) * 1000
+                    metrics().add_time("bedrock_first_token", first_token_ms)
+                    print(f"Time to first token: {first_token_ms:.0f} ms")
+                    first = False
+                yield data["delta"]["text"]
+    finally:
+        # The rest of the generation, after invoke_bedrock() timed the call itself
+        metrics().add_time("bedrock", (time.perf_counter() - started) * 1000)
+
+# ---------- ANSWER CACHE ----------
+
+class MemoryAnswerStore:
+    """In-process answer store, LRU-bounded to `max_entries`."""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (answer, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[1] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, answer, ttl):
+        with self._lock:
+            self._entries[key] = (answer, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteAnswerStore:
+    """Answer store in a SQLite file, standing in for a store shared by containers.
+
+    Entries past their expiry are ignored and purged on write; beyond
+    `max_entries` the least recently used entries are deleted.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, answer TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT answer FROM answers WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def set(self, key, answer, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, answer, now + ttl, now)
+            )
+            self._db.execute("DELETE FROM answers WHERE expires_at < ?", (now,))
+            self._db.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+
+
+class AnswerCache:
+    """Claude answers keyed on (department, question tokens, context fingerprint).
+
+    The fingerprint covers the ETag of every file in the context, so an
+    answer is no longer found once any of those files changes.
+    """
+
+    def __init__(self, store, ttl=ANSWER_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(department, question, fingerprint):
+        # Word order matters ("semester 3 but not semester 5"); only case, punctuation and stopwords are ignored
+        tokens = tokenize(question)
+        return hashlib.sha256(json.dumps([department.lower(), tokens, fingerprint]).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if self.store is None:
+            return None
+        answer = self.store.get(key)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        metrics().count("answer_cache_misses" if answer is None else "answer_cache_hits")
+        return answer
+
+    def set(self, key, answer):
+        if self.store is not None:
+            self.store.set(key, answer, self.ttl)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hits / total, 3) if total else 0.0}
+
+
+def _answer_store(kind):
+    if kind == "sqlite":
+        return SQLiteAnswerStore()
+    if kind == "memory":
+        return MemoryAnswerStore()
+    return None
+
+answer_cache = AnswerCache(_answer_store(ANSWER_CACHE))
+
+def context_fingerprint(bucket, keys, fetched):
+    """Hash of the context files and their versions (ETag, or content hash if uncached)."""
+    parts = [f"{key}={file_version(bucket, key, fetched[key])}" for key in keys]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def answer_from_context(bucket, dept_prefixes, primary, question, fetched, stream=False, max_tokens=CLAUDE_MAX_TOKENS):
+    """Claude fallback: assemble context, retrieve the best chunks and ask Claude.
+
+    With several `dept_prefixes` the chunks of all departments are ranked
+    together and the best ones overall go into a single Claude call.
+    Answers are cached per question and context version, so a repeated
+    question skips both retrieval and Bedrock. With `stream` an iterator of
+    text pieces is returned and the answer is cached once it is complete.
+    The answer is limited to `max_tokens`.
+    """
+    context_keys = assemble_context(bucket, dept_prefixes, primary, fetched=fetched)
+    departments = ",".join(prefix.rstrip("/") for prefix in dept_prefixes)
+    cache_key = AnswerCache.make_key(departments, question, context_fingerprint(bucket, context_keys, fetched))
+    answer = answer_cache.get(cache_key)
+    if answer is not None:
+        print("Answer cache hit")
+        return iter([answer]) if stream else answer
+
+    best_context = find_best_chunks_indexed(bucket, context_keys, fetched, question)
+    if stream:
+        return _stream_and_cache(ask_claude_stream(best_context, question, max_tokens), cache_key)
+    answer = ask_claude(best_context, question, max_tokens)
+    answer_cache.set(cache_key, answer)
+    return answer
+
+def _stream_and_cache(pieces, cache_key):
+    received = []
+    for piece in pieces:
+        received.append(piece)
+        yield piece
+    answer_cache.set(cache_key, "".join(received))
+
+# ---------- LOOKUP INDEXES ----------
+
+HONORIFICS = {"dr", "mr", "mrs", "ms", "prof"}
+COURSE_CODE = re.compile(r"\b([a-z]{2,4}\d{3})\b")
+SEMESTER_NUMBER = re.compile(r"(?:\b|(?<=sem)|(?<=semester))([1-8])\b")
+SEMESTER_WORD = re.compile(
+    r"\b(?:(first|second|third|fourth|fifth|sixth|seventh|eighth)\s+sem|sem(?:ester)?\s+(i{1,3}|iv|vi{0,3}|v))\b"
+)
+SEMESTER_WORDS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8,
+    "i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8,
+}
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def phrases(text, max_words):
+    """Every run of up to `max_words` consecutive words in `text`."""
+    tokens = words(text)
+    return {" ".join(tokens[i:i + n]) for n in range(1, max_words + 1) for i in range(len(tokens) - n + 1)}
+
+def semester_numbers(text):
+    """Semester numbers mentioned in `text` ("sem 3", "semester3", "third sem", "sem iii")."""
+    numbers = {int(n) for n in SEMESTER_NUMBER.findall(text.lower())}
+    for ordinal, roman in SEMESTER_WORD.findall(text.lower()):
+        numbers.add(SEMESTER_WORDS[ordinal or roman])
+    return numbers
+
+def _achievements(value):
+    try:
+        items = json.loads(value)
+    except (TypeError, ValueError):
+        return [value] if value else []
+    return items if isinstance(items, list) else [items]
+
+@timed("lookup_build")
+def build_faculty_lookup(text):
+    """Formatted faculty entries and name token -> entry positions."""
+    faculty_data = json.loads(text)
+    if isinstance(faculty_data, dict):
+        faculty_data = faculty_data.get("faculty", [])
+
+    listing, details, by_token = [], [], {}
+    for i, fac in enumerate(faculty_data):
+        listing.append(f"{i + 1}. {fac.get('Name', 'Unknown')} ({fac.get('Title', 'Faculty')})")
+        details.append(f"""Name: {fac.get("Name")}
+Title: {fac.get("Title")}
+Email: {fac.get("Email")}
+Phone: {fac.get("Phone")}
+Qualification: {fac.get("Qualification")}
+Research Interests: {fac.get("Research_Of_Interest")}
+Achievements:\n- {chr(10).join(map(str, _achievements(fac.get("Achievements", "[]"))))}""")
+        for token in words(fac.get("Name", "")):
+            if len(token) > 1 and token not in HONORIFICS:
+                by_token.setdefault(token, []).append(i)
+    return {"listing": "Faculty Members:\n\n" + "\n".join(listing), "details": details, "by_token": by_token}
+
+@timed("lookup_build")
+def build_project_lookup(text):
+    """Formatted industry projects and project/industry/student name -> project positions."""
+    projects = json.loads(text)
+    formatted, by_name, max_words = [], {}, 1
+    for i, proj in enumerate(projects):
+        formatted.append(
+            f"🏭 *{proj.get('project_name', 'N/A')}* at _{proj.get('industry_name', 'N/A')}_\n"
+            f"👨‍🎓 Students: {proj.get('students_involved', 'N/A')}\n"
+            f"📅 Duration: {proj.get('duration', 'N/A')}\n"
+            f"✅ Status: {proj.get('status', 'N/A')}\n"
+        )
+        names = [proj.get("project_name", ""), proj.get("industry_name", "")]
+        names += proj.get("students_involved", "").split(",")
+        for name in names:
+            key = " ".join(words(name))
+            if key:
+                by_name.setdefault(key, []).append(i)
+                max_words = max(max_words, len(key.split()))
+    return {"formatted": formatted, "by_name": by_name, "max_words": max_words}
+
+def _semester_number(label):
+    digits = re.search(r"\d+", label)
+    if digits:
+        return int(digits.group())
+    return SEMESTER_WORDS.get(words(label)[-1]) if words(label) else None
+
+@timed("lookup_build")
+def build_syllabus_lookup(text):
+    """Formatted semester blocks by semester number and syllabus courses by code."""
+    syllabus_data = json.loads(text)
+    semesters, by_number, by_code = [], {}, {}
+    for dept_key, dept_syllabus in syllabus_data.items():
+        for semester, subjects in dept_syllabus.items():
+            block = [f"📘 **{dept_key.replace('_', ' ')} - {semester.replace('_', ' ')} Courses**:\n"]
+            for code, info in subjects.items():
+                title = info.get("title", "Untitled")
+                units = info.get("units", [])
+                course = f"🔹 {code} - {title}\nUnits:\n" + "\n".join([f"  - {unit}" for unit in units]) + "\n"
+                block.append(course)
+                by_code.setdefault(code.lower(), []).append(course)
+            by_number.setdefault(_semester_number(semester), []).append(len(semesters))
+            semesters.append("\n".join(block))
+    return {"semesters": semesters, "by_number": by_number, "by_code": by_code}
+
+@timed("lookup_build")
+def build_course_lookup(text):
+    """Course records of courses.json / elective_courses.json by course code."""
+    by_code = {}
+    for course in json.loads(text):
+        code = course.get("course_code") or course.get("code")
+        if not code:
+            continue
+        lines = [f"🔹 {code} - {course.get('course_name') or course.get('title', 'N/A')}"]
+        for field, value in course.items():
+            if field not in ("course_code", "code", "course_name", "title"):
+                lines.append(f"{field.replace('_', ' ').title()}: {_field_text(value)}")
+        by_code.setdefault(code.lower(), []).append("\n".join(lines))
+    return {"by_code": by_code}
+
+def parse_json(text):
+    """The file's parsed JSON, shared by every request: treat it as read-only."""
+    return json.loads(text)
+
+def get_lookup(bucket, key, text, build):
+    """Lookup index `build(text)` for one department file, kept on its cache entry."""
+    entry = corpus_cache.get(bucket, key)
+    if entry is None or entry["text"] is not text:
+        return build(text)
+    return corpus_cache.derived(entry, build.__name__, lambda: build(text))
+
+# ---------- INTENT ROUTER ----------
+
+INTENTS = []  # registration order breaks ties between equally scored intents
+
+def intent(name, keywords=(), weak=(), patterns=(), max_tokens=CLAUDE_MAX_TOKENS):
+    """Register the decorated function as the handler for intent `name`.
+
+    Each keyword match scores one point per word of the keyword (longer
+    phrases are more specific); `weak` keywords such as "list" score half a
+    point; `patterns` are regular expressions (lowercase) scoring one point.
+    `max_tokens` caps the length of the intent's Claude answers.
+    """
+    def register(handler):
+        INTENTS.append({
+            "name": name,
+            "handler": handler,
+            "keywords": list(keywords),
+            "weak": list(weak),
+            "patterns": list(patterns),
+            "max_tokens": max_tokens,
+        })
+        return handler
+    return register
+
+
+class IntentRouter:
+    """Scores every intent in a single regex pass over the question.
+
+    All keywords are compiled into one alternation with word boundaries
+    (longest first, so phrases win over their words, and an optional plural
+    "s"/"es"); each match adds its weight to the intents that own it.
+    """
+
+    def __init__(self, intents, default="default"):
+        self.default = default
+        self.handlers = {spec["name"]: spec["handler"] for spec in intents}
+        self.max_tokens = {spec["name"]: spec["max_tokens"] for spec in intents}
+        self.priority = {spec["name"]: order for order, spec in enumerate(intents)}
+        self.keyword_weights = {}  # keyword -> [(intent, weight)]
+        self.pattern_intents = {}  # group name -> intent
+        for spec in intents:
+            for keyword in spec["keywords"]:
+                self.keyword_weights.setdefault(keyword, []).append((spec["name"], float(len(keyword.split()))))
+            for keyword in spec["weak"]:
+                self.keyword_weights.setdefault(keyword, []).append((spec["name"], 0.5))
+
+        alternatives = [
+            "(?P<kw>" + "|".join(re.escape(k) for k in sorted(self.keyword_weights, key=len, reverse=True)) + ")(?:e?s)?"
+        ]
+        for spec in intents:
+            for pattern in spec["patterns"]:
+                group = f"p{len(self.pattern_intents)}"
+                self.pattern_intents[group] = spec["name"]
+                alternatives.append(f"(?P<{group}>{pattern})")
+        self.regex = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+    def scores(self, question):
+        scores = Counter()
+        for match in self.regex.finditer(question.lower()):
+            keyword = match.group("kw")
+            if keyword is not None:
+                for name, weight in self.keyword_weights[keyword]:
+                    scores[name] += weight
+            else:
+                scores[self.pattern_intents[match.lastgroup]] += 1.0
+        return scores
+
+    def route(self, question):
+        """Return (intent, confidence): the best intent and its share of the total score."""
+        scores = self.scores(question)
+        if not scores:
+            return self.default, 0.0
+        best = min(scores, key=lambda name: (-scores[name], self.priority[name]))
+        return best, scores[best] / sum(scores.values())
+
+
+class Query:
+    """One question being answered, with the department files read for it so far."""
+
+    def __init__(self, question, department, stream=False, max_tokens=CLAUDE_MAX_TOKENS, fetched=None):
+        self.question = question
+        self.lower_q = question.lower()
+        self.department = department
+        self.dept_prefix = department.lower() + "/"
+        self.bucket = BUCKET
+        self.fetched = dict(fetched or {})  # key -> text read during this request
+        self.stream = stream
+        self.max_tokens = max_tokens
+
+    def read(self, name):
+        return read_once(self.bucket, self.dept_prefix + name, self.fetched)
+
+    def lookup(self, name, build):
+        """Lookup index built by `build` from the department file `name`."""
+        return get_lookup(self.bucket, self.dept_prefix + name, self.read(name), build)
+
+    def json(self, name):
+        """Parsed (read-only) content of the department file `name`."""
+        return self.lookup(name, parse_json)
+
+    def ask_claude(self, primary):
+        """Claude fallback with `primary` files first in the context."""
+        return answer_from_context(
+            self.bucket, [self.dept_prefix], primary, self.question, self.fetched, self.stream, self.max_tokens
+        )
+
+# ---------- INTENT HANDLERS ----------
+
+@intent("faculty", keywords=["faculty", "professor", "staff", "teacher", "hod"], max_tokens=350)
+def handle_faculty(q):
+    faculty = q.lookup("faculty.json", build_faculty_lookup)
+
+    # If "list faculty" is asked
+    if "list" in q.lower_q and "faculty" in q.lower_q:
+        return 200, faculty["listing"]
+
+    # Search for specific faculty by name
+    matched = sorted({i for token in words(q.lower_q) for i in faculty["by_token"].get(token, ())})
+    if matched:
+        return 200, "\n\n".join(faculty["details"][i] for i in matched)
+
+    # If no match, fallback to Claude
+    return 200, q.ask_claude(["faculty.json"])
+
+
+@intent("conference", keywords=["conference", "paper", "authors"])
+def handle_conference(q):
+    return 200, q.ask_claude(["conferencepapers.json"])
+
+
+# Project Topic Suggestions by Domain
+@intent("project_ideas", keywords=[
+    "project topics", "project ideas", "mini project", "final year project", "domain projects",
+    "ai project", "iot project", "cloud project", "data science project", "cybersecurity project",
+    "blockchain project", "web development project", "mobile app project"
+])
+def handle_project_ideas(q):
+    project_data = q.json("industrial_project_ideas.json")
+
+    matched_domains = []
+    response_lines = []
+
+    for domain in project_data:
+        if domain.lower() in q.lower_q:
+            matched_domains.append(domain)
+
+    if matched_domains:
+        for domain in matched_domains:
+            response_lines.append(f"🔷 **{domain} Projects:**")
+            for topic in project_data[domain]:
+                response_lines.append(f"• {topic}")
+            response_lines.append("")  # Empty line for spacing
+    else:
+        # No specific domain matched – list all
+        for domain, topics in project_data.items():
+            response_lines.append(f"🔷 **{domain} Projects:**")
+            for topic in topics:
+                response_lines.append(f"• {topic}")
+            response_lines.append("")
+
+    return 200, "\n".join(response_lines)
+
+
+# ✅ Industry Projects ("project", "list" and "tell me about" alone are only weak hints)
+@intent("industry", keywords=[
+    "industry project", "industry projects", "company", "companies",
+    "internship", "internships", "collaboration", "collaborations",
+    "geons", "students involved",
+    "duration", "status"
+], weak=["project", "tell me about", "list"])
+def handle_industry(q):
+    # Read the industry projects JSON
+    try:
+        projects = q.lookup("industry_projects.json", build_project_lookup)
+    except Exception as e:
+        return 500, f"❌ Failed to load project data: {str(e)}"
+
+    # Match a project, industry or student name mentioned in the question
+    matched = sorted({
+        i for phrase in phrases(q.lower_q, projects["max_words"]) for i in projects["by_name"].get(phrase, ())
+    })
+
+    # General listing of all if "list", "all", or "display" in query
+    if not matched and any(word in q.lower_q for word in ["list", "all", "display", "show"]):
+        matched = range(len(projects["formatted"]))
+
+    # If we found matches, format nicely
+    if matched:
+        answer = "\n\n".join(projects["formatted"][i] for i in matched)
+    else:
+        answer = "⚠️ Sorry, no matching industry project information found for your query."
+
+    return 200, answer
+
+
+# FAQs and Vision/Mission
+@intent("faq", keywords=["vision", "mission", "outcome", "objectives", "goal", "department aim"], max_tokens=300)
+def handle_faq(q):
+    return 200, q.ask_claude(["faqs.json"])
+
+
+# 📘 Important Question Links (by semester or subject)
+SEM_MAP = {
+    "1": "Semester 1", "first": "Semester 1", "sem 1": "Semester 1",
+    "2": "Semester 2", "second": "Semester 2", "sem 2": "Semester 2",
+    "3": "Semester 3", "third": "Semester 3", "sem 3": "Semester 3",
+    "4": "Semester 4", "fourth": "Semester 4", "sem 4": "Semester 4",
+    "5": "Semester 5", "fifth": "Semester 5", "sem 5": "Semester 5",
+    "6": "Semester 6", "sixth": "Semester 6", "sem 6": "Semester 6",
+    "7": "Semester 7", "seventh": "Semester 7", "sem 7": "Semester 7",
+    "8": "Semester 8", "eighth": "Semester 8", "sem 8": "Semester 8",
+}
+
+@intent("important_links", keywords=[
+    "important question", "important questions link", "important links", "youtube links",
+    "video links", "question links", "sem videos", "semester videos", "unit links"
+])
+def handle_important_links(q):
+    link_data = q.json("important_questions_links.json")
+
+    # 🔍 1. Check for semester-level request (with better matching)
+    found_semester = None
+    for key, label in SEM_MAP.items():
+        # Use whole-word regex match to avoid partial or fuzzy issues
+        if re.search(rf"\b{re.escape(key)}\b", q.lower_q):
+            found_semester = label
+            break
+
+    print(f"Resolved semester from query: {found_semester}")
+
+    if found_semester and found_semester in link_data:
+        links = link_data[found_semester]
+        response_lines = [f"🎓 **{found_semester} Important Question Links:**\n"]
+        for subject, url in links.items():
+            response_lines.append(f"🔗 [{subject}]({url})")
+        return 200, "\n".join(response_lines)
+
+    # 🔍 2. Check for subject-level request
+    for sem, subjects in link_data.items():
+        for subject, url in subjects.items():
+            if subject.lower() in q.lower_q:
+                return 200, f"🔗 **{subject}** ({sem})\n[Click here for Important Question Link]({url})"
+
+    return 200, "Sorry, I couldn't find the important question links for that subject or semester. Please check the spelling or try asking again!"
+
+
+# Syllabus / Semester-wise Course Info
+@intent("syllabus", keywords=[
+    "semester", "syllabus", "unit", "lesson", "topics", "subjects", "units",
+    "second sem", "third sem", "first sem", "fourth sem", "fifth sem",
+    "sixth sem", "seventh sem", "eighth sem", "sem i", "sem ii", "sem iii",
+    "sem iv", "sem v", "sem vi", "sem vii", "sem viii"
+])
+def handle_syllabus(q):
+    syllabus = q.lookup("coursesyllabus.json", build_syllabus_lookup)
+
+    # ✅ Semesters mentioned in the question, across all departments in the syllabus JSON
+    positions = sorted({i for n in semester_numbers(q.lower_q) for i in syllabus["by_number"].get(n, ())})
+    if positions:
+        return 200, "\n".join(syllabus["semesters"][i] for i in positions)
+
+    # Units of a specific course code
+    courses = [course for code in COURSE_CODE.findall(q.lower_q) for course in syllabus["by_code"].get(code, ())]
+    if courses:
+        return 200, "\n".join(courses)
+
+    # 🔁 Fallback to Claude or LLM
+    return 200, q.ask_claude(["coursesyllabus.json"])
+
+
+# Course code (e.g., EP101) anywhere in the question
+@intent("course_code", patterns=[r"[a-z]{2,4}\d{3}"], max_tokens=250)
+def handle_course_code(q):
+    codes = COURSE_CODE.findall(q.lower_q)
+    found = []
+    for name, build in [
+        ("courses.json", build_course_lookup),
+        ("elective_courses.json", build_course_lookup),
+        ("coursesyllabus.json", build_syllabus_lookup),
+    ]:
+        try:
+            by_code = q.lookup(name, build)["by_code"]
+        except (ClientError, ValueError, AttributeError) as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        found += [course for code in codes for course in by_code.get(code, ())]
+    if found:
+        return 200, "\n\n".join(found)
+
+    return 200, q.ask_claude(["courses.json", "elective_courses.json"])
+
+
+@intent("electives", keywords=["elective courses", "open elective", "professional elective"])
+def handle_electives(q):
+    elective_data = q.json("elective_courses.json")
+
+    response_lines = ["📘 **Elective Courses Offered:**\n"]
+
+    for course in elective_data:
+        code = course.get("course_code", "N/A")
+        name = course.get("course_name", "N/A")
+        category = course.get("category", "N/A")
+        credits = course.get("credits", "N/A")
+        periods = course.get("periods_per_week", "N/A")
+
+        response_lines.append(f"🔹 {code} - {name} ({category}) – {credits} Credits – {periods}")
+
+    return 200, "\n".join(response_lines)
+
+
+# ✅ Default fallback if nothing matched
+@intent("default")
+def handle_default(q):
+    return 200, q.ask_claude([])
+
+
+router = IntentRouter(INTENTS)
+
+# ---------- CORPUS SNAPSHOT ----------
+
+SNAPSHOT_VERSION = 1
+
+# Lookups prebuilt per file name; every file also gets its retrieval index
+SNAPSHOT_LOOKUPS = {
+    "faculty.json": [build_faculty_lookup],
+    "industry_projects.json": [build_project_lookup],
+    "coursesyllabus.json": [build_syllabus_lookup],
+    "courses.json": [build_course_lookup],
+    "elective_courses.json": [build_course_lookup, parse_json],
+    "industrial_project_ideas.json": [parse_json],
+    "important_questions_links.json": [parse_json],
+}
+
+def snapshot_entry(key, text, etag):
+    """Text, version and prebuilt derived data of one department file."""
+    derived = {"index": build_index(text, etag, source_label(key))}
+    for build in SNAPSHOT_LOOKUPS.get(key.rsplit("/", 1)[-1], ()):
+        derived[build.__name__] = build(text)
+    return {"text": text, "etag": etag, "size": len(text.encode("utf-8")), "derived": derived}
+
+def write_snapshot(path, bucket, files):
+    """Pickle the snapshot entries of `files` ({key: (text, etag)}) to `path`."""
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "bucket": bucket,
+        "created_at": time.time(),
+        "files": {key: snapshot_entry(key, text, etag) for key, (text, etag) in files.items()},
+    }
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    return snapshot
+
+def validate_snapshot(bucket, departments):
+    """Check the snapshot's departments against S3 (one listing each); changed files are reloaded."""
+    def changed(department):
+        try:
+            results = poll_department(bucket, department)
+        except Exception as e:
+            print(f"Could not validate {department}: {e}")
+            return 0
+        return sum(outcome != "unchanged" for outcome in results.values())
+    stale = sum(_fetch_pool.map(changed, departments))
+    print(f"Snapshot validated: {len(departments)} departments, {stale} files reloaded")
+
+def load_snapshot(path=CORPUS_SNAPSHOT, validate=SNAPSHOT_VALIDATE):
+    """Seed the corpus cache from a snapshot so the first requests skip S3 and indexing.
+
+    The snapshot ships with the deployment package (pickle is only safe for
+    files we built ourselves). Its entries are served as fresh while a
+    background thread checks their ETags against S3. Returns the keys loaded.
+    """
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return []
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        print(f"Ignoring snapshot {path}: version {snapshot.get('version')}")
+        return []
+
+    bucket = snapshot["bucket"]
+    for key, stored in snapshot["files"].items():
+        corpus_cache.put(bucket, key, stored["text"], stored["etag"], stored["size"], stored["derived"])
+    keys = list(snapshot["files"])
+    print(f"Loaded snapshot: {len(keys)} files")
+    if validate:
+        departments = sorted({corpus_cache.department_of(key) for key in keys})
+        threading.Thread(target=validate_snapshot, args=(bucket, departments), name="snapshot-validate", daemon=True).start()
+    return keys
+
+# ---------- CORPUS REFRESH ----------
+
+def _same_etag(a, b):
+    # Event notifications send the ETag without the quotes GetObject returns
+    return bool(a and b) and a.strip('"') == b.strip('"')
+
+def refresh_file(bucket, key, etag=None):
+    """Reload one cached department file if it changed, swapping in a fully built entry.
+
+    The new text, retrieval index and lookups are built before the swap, so
+    the next request finds them ready; requests already holding the old
+    text keep using it and its derived data. A known `etag` (from an event
+    or a listing) that matches the cached copy saves the GET.
+    Returns "unchanged", "updated" or "deleted".
+    """
+    entry = corpus_cache.get(bucket, key)
+    if entry and _same_etag(entry["etag"], etag):
+        corpus_cache.revalidated(entry)
+        return "unchanged"
+
+    params = {"Bucket": bucket, "Key": key}
+    if entry and entry["etag"]:
+        params["IfNoneMatch"] = entry["etag"]
+    try:
+        obj = s3_client().get_object(**params)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if entry and code in ("304", "NotModified"):
+            corpus_cache.revalidated(entry)
+            return "unchanged"
+        if code in ("NoSuchKey", "404"):
+            corpus_cache.discard(bucket, key)
+            return "deleted"
+        raise
+
+    raw = obj['Body'].read()
+    prepared = snapshot_entry(key, raw.decode('utf-8'), obj.get("ETag"))
+    corpus_cache.put(bucket, key, prepared["text"], prepared["etag"], len(raw), prepared["derived"])
+    print(f"Refreshed {key}")
+    return "updated"
+
+def s3_changes(event):
+    """(bucket, key, etag, deleted) for each object change in an S3 or EventBridge notification."""
+    changes = []
+    for record in event.get("Records", []):
+        if record.get("eventSource") == "aws:s3":
+            obj = record["s3"]["object"]
+            deleted = record.get("eventName", "").startswith("ObjectRemoved")
+            changes.append((record["s3"]["bucket"]["name"], unquote_plus(obj["key"]), obj.get("eTag"), deleted))
+    if event.get("source") == "aws.s3":
+        detail = event.get("detail", {})
+        deleted = event.get("detail-type") == "Object Deleted"
+        changes.append((detail["bucket"]["name"], detail["object"]["key"], detail["object"].get("etag"), deleted))
+    return changes
+
+def handle_s3_event(event):
+    """Refresh the cached files named in an S3 notification; returns {key: outcome}.
+
+    Only files this container has cached are touched. Other containers pick
+    up the change through poll_department().
+    """
+    results = {}
+    for bucket, key, etag, deleted in s3_changes(event):
+        if key.rsplit("/", 1)[-1] not in FILENAMES:
+            results[key] = "ignored"
+        elif corpus_cache.get(bucket, key) is None:
+            results[key] = "not cached"
+        elif deleted:
+            corpus_cache.discard(bucket, key)
+            results[key] = "deleted"
+        else:
+            results[key] = refresh_file(bucket, key, etag)
+    return results
+
+def poll_department(bucket, department):
+    """List the department's objects once and refresh only the cached files whose ETag changed."""
+    with _poll_lock:
+        _last_polls[(bucket, department)] = time.time()
+    prefix = department.lower() + "/"
+    listing, params = {}, {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        page = s3_client().list_objects_v2(**params)
+        listing.update((obj["Key"], obj["ETag"]) for obj in page.get("Contents", []))
+        if not page.get("IsTruncated"):
+            break
+        params["ContinuationToken"] = page["NextContinuationToken"]
+
+    results = {}
+    for cached_bucket, key in corpus_cache.keys(department.lower()):
+        if cached_bucket != bucket or key.rsplit("/", 1)[-1] not in FILENAMES:
+            continue
+        if key not in listing:
+            corpus_cache.discard(bucket, key)
+            results[key] = "deleted"
+        else:
+            results[key] = refresh_file(bucket, key, listing[key])
+    changed = {key: outcome for key, outcome in results.items() if outcome != "unchanged"}
+    if changed:
+        print(f"Poll {prefix}: {changed}")
+    return results
+
+_last_polls = {}  # (bucket, department) -> time of the last poll
+_poll_lock = threading.Lock()
+
+def schedule_poll(bucket, department):
+    """Start poll_department() in the background if the department is cached and due for a check."""
+    if CORPUS_POLL_INTERVAL <= 0:
+        return
+    if not corpus_cache.keys(department):
+        return  # nothing cached yet, so nothing can be stale (and nothing is recorded for unknown names)
+    now = time.time()
+    with _poll_lock:
+        if now - _last_polls.get((bucket, department), 0) < CORPUS_POLL_INTERVAL:
+            return
+        _last_polls[(bucket, department)] = now
+
+    def poll():
+        try:
+            poll_department(bucket, department)
+        except Exception as e:
+            print(f"Poll of {department} failed: {e}")
+    _fetch_pool.submit(poll)
+
+load_snapshot()
+
+# ---------- MAIN HANDLER ----------
+
+def split_departments(department):
+    """Department names in a `department` parameter such as "cse" or "cse,it,ece"."""
+    names = []
+    for name in department.lower().split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names or ["cse"]
+
+def answer_question(question, department, stream=False, fetched=None):
+    """Route `question` to its intent handler and answer it.
+
+    Returns (status_code, answer). With `stream`, Claude fallbacks return an
+    iterator of text pieces instead of the full answer string. When
+    `department` names several departments the intent's handler runs for
+    each of them (answer_across_departments). Texts already read for the
+    request ({key: text}) can be passed in `fetched`.
+    """
+    departments = split_departments(department)
+    if len(departments) > FANOUT_MAX_DEPARTMENTS:
+        return 400, f"⚠️ Please ask about at most {FANOUT_MAX_DEPARTMENTS} departments at a time."
+    with metrics().stage("route"):
+        name, confidence = router.route(question)
+    for dept in departments:
+        schedule_poll(BUCKET, dept)
+    metrics().set(intent=name, confidence=round(confidence, 2), department=",".join(departments))
+    print(f"→ Intent: {name} (confidence {confidence:.2f})")
+    if len(departments) > 1:
+        return answer_across_departments(question, departments, name, stream, fetched)
+    return router.handlers[name](Query(question, departments[0], stream, router.max_tokens[name], fetched))
+
+class DepartmentQuery(Query):
+    """Query for one department of a cross-department question.
+
+    Its Claude fallback is not called: the files it would have used are
+    recorded instead and the question is asked once for all departments.
+    """
+
+    def ask_claude(self, primary):
+        self.claude_primary = primary
+        return None
+
+def answer_across_departments(question, departments, name, stream=False, fetched=None):
+    """Answer a question about several departments ("hod", "which departments offer machine learning").
+
+    The `name` intent's handler runs for every department in parallel and
+    the answers it finds in the department files are listed per department.
+    The departments it has no answer for go to Claude in a single call:
+    their files are read once (shared copies once), their chunks are ranked
+    together and the best ones overall become the context. A department
+    whose handler fails (e.g. a missing file) gets an error section and
+    the others are still answered; the status is 200 while at least one
+    department was answered and the worst department status otherwise.
+    """
+    metrics().count("departments", len(departments))
+    max_tokens = router.max_tokens[name]
+    queries = [DepartmentQuery(question, dept, stream, max_tokens, fetched) for dept in departments]
+    results = map_in_context(_fetch_pool, lambda q: _department_answer(router.handlers[name], q), queries)
+
+    fetched, sections, pending, primary = dict(fetched or {}), [], [], []
+    for q, (status, answer) in zip(queries, results):
+        fetched.update(q.fetched)
+        if answer is None:
+            pending.append(q.department)
+            primary += [file for file in q.claude_primary if file not in primary]
+        else:
+            sections.append(f"🏫 **{q.department.upper()}**\n{answer}")
+    if not pending:
+        answered = any(status == 200 for status, _ in results)
+        return 200 if answered else max(status for status, _ in results), "\n\n".join(sections)
+
+    claude = answer_from_context(BUCKET, [dept + "/" for dept in pending], primary, question, fetched, stream, max_tokens)
+    if not sections:
+        return 200, claude
+    heading = "\n\n".join(sections) + "\n\n🏫 **" + ", ".join(dept.upper() for dept in pending) + "**\n"
+    return 200, _prepend(heading, claude) if stream else heading + claude
+
+def _department_answer(handler, q):
+    try:
+        return handler(q)
+    except Exception as e:
+        print(f"Error for {q.department}: {e}")
+        return 500, f"❌ Could not answer for {q.department.upper()}: {e}"
+
+def _prepend(text, pieces):
+    yield text
+    yield from pieces
+
+# ---------- BATCH ----------
+
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+
+def preload_departments(bucket, departments):
+    """Read every file of `departments` in one parallel fetch, then build their retrieval indexes.
+
+    The reads are queued from the calling thread, never from a pool task,
+    so they cannot wait behind the tasks that would be waiting for them.
+    """
+    texts, _ = fetch_many(bucket, [department + "/" + name for department in departments for name in FILENAMES])
+
+    def build(key):
+        get_file_index(bucket, key, texts[key])
+        if RETRIEVER == "bm25":
+            get_term_matrix(bucket, key, texts[key])
+    map_in_context(_fetch_pool, build, list(texts))
+    return texts
+
+def _answer_item(item, texts):
+    try:
+        status, answer = answer_question(item["q"], item["department"], fetched=texts)
+    except BedrockDeferred as e:
+        print("Deferred:", str(e))
+        metrics().count("deferred")
+        error = "Not answered within the batch's time budget, please ask again"
+        return {"q": item["q"], "department": item["department"], "status": 503, "error": error}
+    except Exception as e:
+        print("Error:", str(e))
+        return {"q": item["q"], "department": item["department"], "status": 500, "error": str(e)}
+    return {"q": item["q"], "department": item["department"], "status": status, "answer": answer}
+
+def answer_batch(items):
+    """Answer a list of {"q", "department"} items, returning one result per item in order.
+
+    Every department's files are read once for the whole batch and indexed,
+    and each question is answered from those texts, so all questions see
+    the same version of a file. Questions run on BATCH_CONCURRENCY workers.
+    Claude fallbacks still share the BEDROCK_RPS budget, so a fallback that
+    could not start within BATCH_TIME_BUDGET seconds of the batch's start is
+    deferred (status 503) rather than letting the request time out. A
+    failing question gets an "error" instead of failing the batch.
+    """
+    deadline = _bedrock_deadline.set(bedrock_limiter.clock() + BATCH_TIME_BUDGET)
+    try:
+        departments = sorted({dept for item in items for dept in split_departments(item["department"])})
+        texts = preload_departments(BUCKET, departments)
+        print(f"Batch: {len(items)} questions across {len(departments)} departments")
+        results = map_in_context(_batch_pool, lambda item: _answer_item(item, texts), items)
+    finally:
+        _bedrock_deadline.reset(deadline)
+    metrics().set(intent="batch", department=",".join(departments))
+    metrics().count("questions", len(items))
+    return results
+
+def _parse_batch(event):
+    """Validated batch items from a POST body, or raise ValueError."""
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    payload = json.loads(body)
+    questions = payload.get("questions") if isinstance(payload, dict) else None
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("Body must be {\"questions\": [{\"q\": ..., \"department\": ...}, ...]}")
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise ValueError(f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    items = []
+    for entry in questions:
+        if isinstance(entry, str):
+            entry = {"q": entry}
+        question = entry.get("q", "") if isinstance(entry, dict) else ""
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("Every question needs a non-empty string 'q'")
+        question = question.strip()
+        department = entry.get("department") or payload.get("department") or "cse"
+        if not isinstance(department, str):
+            raise ValueError("'department' must be a string such as \"cse\" or \"cse,it\"")
+        if len(split_departments(department)) > FANOUT_MAX_DEPARTMENTS:
+            raise ValueError(f"A question may ask about at most {FANOUT_MAX_DEPARTMENTS} departments")
+        items.append({"q": question, "department": department})
+
+    # Checked before anything is read: preload_departments() fetches every file of every department
+    departments = {dept for item in items for dept in split_departments(item["department"])}
+    if len(departments) > BATCH_MAX_DEPARTMENTS:
+        raise ValueError(f"At most {BATCH_MAX_DEPARTMENTS} departments per batch")
+    return items
+
+def _request_method(event):
+    return event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method", "GET")
+
+def _response(status, payload, cors=True):
+    with metrics().stage("serialize"):
+        body = json.dumps(payload)
+    response = {"statusCode": status, "body": body}
+    if cors:
+        response["headers"] = {"Access-Control-Allow-Origin": "*"}
+    return response
+
+def _handle(event):
+    # S3 notifications (directly or via EventBridge) refresh the changed files
+    if s3_changes(event):
+        metrics().set(intent="s3_event")
+        return _response(200, {"refreshed": handle_s3_event(event)})
+
+    if _request_method(event) == "POST":
+        try:
+            items = _parse_batch(event)
+        except ValueError as e:
+            return _response(400, {"error": str(e)})
+        try:
+            return _response(200, {"results": answer_batch(items)})
+        except Exception as e:
+            print("Error:", str(e))
+            return _response(500, {"error": str(e)}, cors=False)
+
+    # Safe access to query
+    params = event.get("queryStringParameters") or {}
+    question = params.get("q", "").strip()
+    department = params.get("department", "cse")
+
+    if not question:
+        return _response(400, {"error": "Missing query parameter 'q'"}, cors=False)
+
+    try:
+        status, answer = answer_question(question, department)
+        return _response(status, {"answer": answer})
+
+    except Exception as e:
+        print("Error:", str(e))
+        return _response(500, {"error": str(e)}, cors=False)
+
+def lambda_handler(event, context):
+    with request_metrics() as recorded:
+        response = _handle(event)
+        recorded.set(status=response["statusCode"])
+        if METRICS_HEADER:
+            headers = response.setdefault("headers", {})
+            headers["Server-Timing"] = recorded.server_timing()
+            headers["Timing-Allow-Origin"] = "*"
+    return response
@@ -0,0 +1,258 @@
+"""Local stand-ins for S3 and Bedrock, for running the handler without AWS.
+
+LocalS3 serves a directory laid out like the bucket
+(<root>/<bucket>/<department>/<file>.json) and FakeBedrock answers
+deterministically after a configurable delay. Both count their calls so
+benchmark.py can report S3 traffic and prompt sizes:
+
+    import lambda_function
+    from local_backends import FakeBedrock, LocalS3, write_sample_bucket
+
+    write_sample_bucket("/tmp/bucket")
+    lambda_function.set_backends(LocalS3("/tmp/bucket"), FakeBedrock(latency=0.5))
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code, operation, message=""):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+class LocalS3:
+    """Filesystem-backed subset of the S3 client API used by the Lambda."""
+
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.bytes = 0
+            self.not_modified = 0
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _count(self, size=0, not_modified=False):
+        with self._lock:
+            self.calls += 1
+            self.bytes += size
+            self.not_modified += not_modified
+
+    def _read(self, bucket, key, operation):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            with open(self._path(bucket, key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._count()
+            raise _client_error("NoSuchKey", operation, f"{key} does not exist")
+        return data, f'"{hashlib.md5(data).hexdigest()}"'
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        data, etag = self._read(Bucket, Key, "GetObject")
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            self._count(not_modified=True)
+            raise _client_error("304", "GetObject", "Not Modified")
+        self._count(len(data))
+        return {"Body": io.BytesIO(data), "ETag": etag, "ContentLength": len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        data, etag = self._read(Bucket, Key, "HeadObject")
+        self._count()
+        return {"ETag": etag, "ContentLength": len(data)}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = Body.encode("utf-8") if isinstance(Body, str) else Body
+        with open(path, "wb") as f:
+            f.write(data)
+        self._count()
+        return {"ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self._count()
+        contents = []
+        base = os.path.join(self.root, Bucket)
+        for directory, _, files in os.walk(base):
+            for name in files:
+                key = os.path.relpath(os.path.join(directory, name), base).replace(os.sep, "/")
+                if key.startswith(Prefix):
+                    with open(os.path.join(directory, name), "rb") as f:
+                        data = f.read()
+                    contents.append({"Key": key, "ETag": f'"{hashlib.md5(data).hexdigest()}"', "Size": len(data)})
+        contents.sort(key=lambda obj: obj["Key"])
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+
+class FakeBedrock:
+    """Deterministic stand-in for the bedrock-runtime client.
+
+    Every call waits `latency` seconds (plus `token_delay` per streamed
+    word) and answers with a digest of the prompt, so identical prompts get
+    identical answers. Prompt sizes are recorded in `prompt_chars`. The
+    first `fail_first` calls raise ThrottlingException instead, to exercise
+    the handler's retries; they are counted in `throttled`.
+    """
+
+    def __init__(self, latency=0.0, token_delay=0.0, answer_words=40, fail_first=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled = 0
+            self.prompt_chars = []
+
+    def _answer(self, body, operation):
+        request = json.loads(body)
+        prompt = request["messages"][0]["content"]
+        with self._lock:
+            if self.throttled < self.fail_first:
+                self.throttled += 1
+                raise _client_error("ThrottlingException", operation, "Too many requests, please wait before trying again.")
+            self.calls += 1
+            self.prompt_chars.append(len(prompt))
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        filler = random.Random(digest).choices(["college", "course", "faculty", "semester", "unit"], k=self.answer_words)
+        return prompt, f"[{digest[:8]}] " + " ".join(filler)
+
+    def _usage(self, prompt, answer):
+        return {"input_tokens": len(prompt) // 4, "output_tokens": len(answer.split())}
+
+    def invoke_model(self, modelId, body, **kwargs):
+        prompt, answer = self._answer(body, "InvokeModel")
+        time.sleep(self.latency)
+        payload = {"content": [{"type": "text", "text": answer}], "usage": self._usage(prompt, answer)}
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8")), "contentType": "application/json"}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        prompt, answer = self._answer(body, "InvokeModelWithResponseStream")
+
+        def events():
+            time.sleep(self.latency)
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start"}).encode("utf-8")}}
+            for i, word in enumerate(answer.split(" ")):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                delta = {"type": "text_delta", "text": word if i == 0 else " " + word}
+                yield {"chunk": {"bytes": json.dumps({"type": "content_block_delta", "index": 0, "delta": delta}).encode("utf-8")}}
+            yield {"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode("utf-8")}}
+
+        return {"body": events(), "contentType": "application/json"}
+
+
+# ---------- SAMPLE DATA ----------
+
+FIRST_NAMES = ["Anitha", "Ravi", "Priya", "Karthik", "Meena", "Suresh", "Lakshmi", "Arun", "Deepa", "Vignesh",
+               "Kavya", "Rajesh", "Divya", "Ganesh", "Nithya", "Prakash", "Sangeetha", "Manoj", "Revathi", "Balaji"]
+LAST_NAMES = ["Kumar", "Shankar", "Raman", "Krishnan", "Subramanian", "Natarajan", "Iyer", "Pillai", "Reddy", "Nair"]
+SUBJECTS = ["Operating Systems", "Computer Networks", "Database Management Systems", "Compiler Design",
+            "Data Structures", "Theory of Computation", "Machine Learning", "Cloud Computing", "Cyber Security",
+            "Software Engineering", "Computer Architecture", "Artificial Intelligence", "Internet of Things",
+            "Digital Logic", "Discrete Mathematics", "Web Technologies", "Big Data Analytics", "Computer Graphics",
+            "Distributed Systems", "Mobile Computing", "Cryptography", "Data Mining", "Image Processing",
+            "Natural Language Processing"]
+DOMAINS = ["AI", "IoT", "Cloud", "Data Science", "Cybersecurity", "Blockchain", "Web Development", "Mobile App"]
+COMPANIES = ["Geons", "Infosys", "Zoho", "TCS", "Freshworks", "Cognizant", "Wipro", "HCL"]
+PROJECTS = ["Smart Parking", "Crop Disease Detection", "Campus Navigator", "Attendance Analytics",
+            "Energy Monitor", "Library Chatbot", "Bus Tracker", "Hostel Management", "Fraud Detection",
+            "Traffic Prediction", "Resume Screener", "Water Quality Monitor"]
+
+
+def sample_department(department, seed=0):
+    """Synthetic content for every department file, shaped like the real bucket."""
+    rng = random.Random(f"{department}-{seed}")
+    code = department.upper()[:2]
+
+    faculty = []
+    for i in range(30):
+        name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i * 7 + len(department)) % len(LAST_NAMES)]}"
+        faculty.append({
+            "Name": f"{'Dr.' if i % 3 == 0 else 'Mr.' if i % 2 else 'Ms.'} {name}",
+            "Title": "Professor & HOD" if i == 0 else rng.choice(["Professor", "Associate Professor", "Assistant Professor"]),
+            "Email": f"{name.split()[0].lower()}.{i}@college.edu",
+            "Phone": f"98400{i:05d}",
+            "Qualification": rng.choice(["Ph.D", "M.E", "M.Tech, Ph.D"]),
+            "Research_Of_Interest": ", ".join(rng.sample(SUBJECTS, 2)),
+            "Achievements": json.dumps([f"{rng.choice(['Best Teacher Award', 'Patent granted', 'Funded project'])} {2015 + i % 9}"
+                                        for _ in range(rng.randint(1, 4))]),
+        })
+
+    syllabus, courses = {}, []
+    for sem in range(1, 9):
+        semester = {}
+        for j in range(6):
+            subject = SUBJECTS[(sem * 6 + j) % len(SUBJECTS)]
+            course_code = f"{code}{sem}{j:02d}"
+            semester[course_code] = {"title": subject, "units": [f"{subject} unit {u}: topic {rng.randint(1, 99)}" for u in range(1, 6)]}
+            courses.append({"course_code": course_code, "course_name": subject, "credits": rng.choice([3, 4]),
+                            "semester": sem, "category": "Professional Core"})
+        syllabus[f"Semester_{sem}"] = semester
+
+    return {
+        "faculty.json": faculty,
+        "courses.json": courses,
+        "elective_courses.json": [
+            {"course_code": f"{code}E{i:02d}", "course_name": SUBJECTS[(i * 5) % len(SUBJECTS)],
+             "category": rng.choice(["Professional Elective", "Open Elective"]), "credits": 3, "periods_per_week": "3-0-0"}
+            for i in range(15)
+        ],
+        "coursesyllabus.json": {department.upper(): syllabus},
+        "faqs.json": [
+            {"question": "What is the vision of the department?", "answer": f"To make {department.upper()} a centre of excellence."},
+            {"question": "What is the mission of the department?", "answer": "To impart quality education and research."},
+            {"question": "What are the program outcomes?", "answer": "Graduates apply engineering knowledge to real problems."},
+        ] + [{"question": f"FAQ {i} about {SUBJECTS[i % len(SUBJECTS)]}?", "answer": f"Answer {i} " * 10} for i in range(15)],
+        "industry_projects.json": [
+            {"project_name": PROJECTS[i], "industry_name": COMPANIES[i % len(COMPANIES)],
+             "students_involved": ", ".join(rng.sample(FIRST_NAMES, 3)),
+             "duration": f"{rng.randint(2, 6)} months", "status": rng.choice(["Completed", "Ongoing"])}
+            for i in range(len(PROJECTS))
+        ],
+        "industrial_project_ideas.json": {domain: [f"{domain} idea {i}: {rng.choice(SUBJECTS)} based system" for i in range(6)]
+                                          for domain in DOMAINS},
+        "important_questions_links.json": {
+            f"Semester {sem}": {syllabus[f'Semester_{sem}'][c]["title"]: f"https://youtu.be/{department}{sem}{i}"
+                                for i, c in enumerate(syllabus[f"Semester_{sem}"])}
+            for sem in range(1, 9)
+        },
+        "conferencepapers.json": [
+            {"title": f"{rng.choice(['A study of', 'Improving', 'Towards'])} {rng.choice(SUBJECTS)}",
+             "authors": ", ".join(f["Name"] for f in rng.sample(faculty, 2)),
+             "conference": rng.choice(["ICML", "IEEE ICC", "ACM SIGCSE", "ICACCS"]), "year": rng.randint(2018, 2024)}
+            for _ in range(40)
+        ],
+    }
+
+
+def write_sample_bucket(root, bucket="college-ai-data", departments=("cse", "it"), seed=0):
+    """Write synthetic department files to <root>/<bucket>/<department>/."""
+    for department in departments:
+        directory = os.path.join(root, bucket, department)
+        os.makedirs(directory, exist_ok=True)
+        for name, content in sample_department(department, seed).items():
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                json.dump(content, f, indent=2)
+    return root
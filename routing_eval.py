@@ -0,0 +1,141 @@
+"""Measure intent routing accuracy and cost on a labeled query set.
+
+Compares the compiled IntentRouter with the keyword if-chain lambda_handler
+used before it, on LABELED_QUERIES below (or a JSON file of
+[{"question": ..., "intent": ...}] passed with --queries).
+
+Usage:
+    python routing_eval.py [--queries queries.json] [--repeat 2000] [--show-errors]
+"""
+
+import argparse
+import json
+import re
+import time
+
+from lambda_function import router
+
+LABELED_QUERIES = [
+    ("hod", "faculty"),
+    ("who is the hod of cse", "faculty"),
+    ("faculty list", "faculty"),
+    ("list faculty", "faculty"),
+    ("list of professors in the department", "faculty"),
+    ("contact details of the staff", "faculty"),
+    ("which teacher handles data structures", "faculty"),
+    ("conference paper published", "conference"),
+    ("papers published by the department in 2023", "conference"),
+    ("who are the authors of the crop disease paper", "conference"),
+    ("project ideas", "project_ideas"),
+    ("give me some ai project ideas", "project_ideas"),
+    ("final year project topics in iot", "project_ideas"),
+    ("mini project suggestions", "project_ideas"),
+    ("blockchain project ideas for students", "project_ideas"),
+    ("display all the industrial projects done", "industry"),
+    ("list all industry projects", "industry"),
+    ("Tell me about the Smart Parking", "industry"),
+    ("which companies offer internships", "industry"),
+    ("status of the smart parking project", "industry"),
+    ("students involved in the geons collaboration", "industry"),
+    ("mission and vision", "faq"),
+    ("what is the vision of the department", "faq"),
+    ("program outcomes of cse", "faq"),
+    ("what are the department objectives", "faq"),
+    ("important questions link for operating systems", "important_links"),
+    ("unit links of sem 3", "important_links"),
+    ("youtube links for semester 5", "important_links"),
+    ("sem videos for third semester", "important_links"),
+    ("subjects in semester 3", "syllabus"),
+    ("units of operating systems", "syllabus"),
+    ("syllabus for fifth sem", "syllabus"),
+    ("list the subjects in semester 4", "syllabus"),
+    ("what topics are covered in compiler design", "syllabus"),
+    ("list the units of computer networks", "syllabus"),
+    ("CS301", "course_code"),
+    ("credits for CS301", "course_code"),
+    ("what is EP101 about", "course_code"),
+    ("elective courses available", "electives"),
+    ("list of open elective courses", "electives"),
+    ("professional elective options", "electives"),
+    ("show me the elective courses", "electives"),
+    ("what is the method of evaluation", "default"),
+    ("where is the college located", "default"),
+    ("how do i apply for a scholarship", "default"),
+]
+
+
+def legacy_route(question):
+    """Intent chosen by the sequential keyword checks lambda_handler used before the router."""
+    lower_q = question.lower()
+    if any(word in lower_q for word in ["faculty", "professor", "staff", "teacher", "hod"]):
+        return "faculty"
+    if "conference" in lower_q or "paper" in lower_q or "authors" in lower_q:
+        return "conference"
+    if any(word in lower_q for word in [
+        "project topics", "project ideas", "mini project", "final year project", "domain projects",
+        "ai project", "iot project", "cloud project", "data science project", "cybersecurity project",
+        "blockchain project", "web development project", "mobile app project"
+    ]):
+        return "project_ideas"
+    if any(word in lower_q for word in [
+        "industry project", "industry projects", "company", "companies",
+        "internship", "internships", "collaboration", "collaborations",
+        "geons", "students involved", "duration", "status"
+    ]) or "project" in lower_q or "tell me about" in lower_q or "list" in lower_q:
+        return "industry"
+    if any(word in lower_q for word in ["vision", "mission", "outcome", "objectives", "goal", "department aim"]):
+        return "faq"
+    if any(word in lower_q for word in [
+        "important question", "important questions link", "important links", "youtube links",
+        "video links", "question links", "sem videos", "semester videos", "unit links"
+    ]):
+        return "important_links"
+    if any(word in lower_q for word in [
+        "semester", "syllabus", "unit", "lesson", "topics", "subjects", "units",
+        "second sem", "third sem", "first sem", "fourth sem", "fifth sem",
+        "sixth sem", "seventh sem", "eighth sem", "sem i", "sem ii", "sem iii",
+        "sem iv", "sem v", "sem vi", "sem vii", "sem viii"
+    ]):
+        return "syllabus"
+    if re.match(r"[A-Z]{2,4}\d{3}", question.strip().upper()):
+        return "course_code"
+    if "elective courses" in lower_q or "open elective" in lower_q or "professional elective" in lower_q:
+        return "electives"
+    return "default"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", help="labeled queries (JSON) instead of LABELED_QUERIES")
+    parser.add_argument("--repeat", type=int, default=2000, help="timed passes over the query set")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    queries = LABELED_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [(q["question"], q["intent"]) for q in json.load(f)]
+
+    routers = {
+        "legacy": legacy_route,
+        "compiled": lambda question: router.route(question)[0],
+    }
+
+    print(f"{'router':<10}{'accuracy':>10}{'us/query':>10}")
+    for name, route in routers.items():
+        errors = [(question, label, route(question)) for question, label in queries if route(question) != label]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for question, _ in queries:
+                route(question)
+        per_query = (time.perf_counter() - start) / (args.repeat * len(queries)) * 1e6
+
+        print(f"{name:<10}{1 - len(errors) / len(queries):>10.2%}{per_query:>10.2f}")
+        if args.show_errors:
+            for question, label, got in errors:
+                print(f"    {question!r}: expected {label}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""HTTP entry point that streams answers as they are generated.
+
+Python Lambdas cannot stream a response on their own, so this server is
+run behind the AWS Lambda Web Adapter with AWS_LWA_INVOKE_MODE=response_stream
+and a function URL (see README). It answers the same query string as
+lambda_handler and writes newline-delimited JSON with chunked transfer
+encoding:
+
+    {"delta": "The HOD of CSE "}
+    {"delta": "is ..."}
+    {"done": true}
+
+A failure after streaming has started is sent as {"error": "..."}.
+"""
+
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from lambda_function import answer_question, request_metrics
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _cors(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        question = params.get("q", "").strip()
+        department = params.get("department", "cse")
+
+        if not question:
+            body = json.dumps({"error": "Missing query parameter 'q'"}).encode("utf-8")
+            self.send_response(400)
+            self._cors()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Metrics are logged once the whole answer has been streamed
+        with request_metrics() as recorded:
+            self._stream_answer(question, department, recorded)
+
+    def _stream_answer(self, question, department, recorded):
+        try:
+            status, answer = answer_question(question, department, stream=True)
+            pieces = [answer] if isinstance(answer, str) else answer
+        except Exception as e:
+            print("Error:", str(e))
+            status, pieces = 500, None
+            error = str(e)
+
+        recorded.set(status=status)
+        self.send_response(status)
+        self._cors()
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        if pieces is None:
+            self._write_chunk({"error": error})
+        else:
+            try:
+                for piece in pieces:
+                    self._write_chunk({"delta": piece})
+                self._write_chunk({"done": True})
+            except Exception as e:
+                print("Error:", str(e))
+                self._write_chunk({"error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", "8080"))
+    print(f"Streaming answers on port {port}")
+    ThreadingHTTPServer(("0.0.0.0", port), StreamHandler).serve_forever()